@@ -0,0 +1,4 @@
+import time
+
+# Instant du premier import du paquet (mesure de la phase d'import)
+IMPORT_STARTED = time.perf_counter()
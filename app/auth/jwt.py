@@ -3,8 +3,8 @@ from typing import Any, Dict, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import BaseModel
+from sqlalchemy.orm import noload
 from sqlmodel import Session, select
 
 from app.auth.password import (  # Importation depuis password.py
@@ -48,6 +48,8 @@ def create_access_token(
     data: Dict[str, Any], expires_delta: Optional[timedelta] = None
 ):
     """Crée un token JWT."""
+    from jose import jwt  # Import différé au premier usage
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (
         expires_delta
@@ -65,6 +67,8 @@ async def get_current_user(
     session: Session = Depends(get_session),
 ):
     """Récupère l'utilisateur actuel à partir du token JWT."""
+    from jose import JWTError, jwt  # Import différé au premier usage
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Identifiants invalides",
@@ -81,7 +85,12 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    statement = select(User).where(User.email == token_data.email)
+    # Emplacements non chargés : inutiles ici, et répartis sous sharding
+    statement = (
+        select(User)
+        .where(User.email == token_data.email)
+        .options(noload(User.locations))
+    )
     user = session.exec(statement).first()
     if user is None:
         raise credentials_exception
@@ -1,14 +1,19 @@
-from passlib.context import CryptContext
+from functools import lru_cache
 
-# Une seule instance de CryptContext pour toute l'application
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache()
+def get_pwd_context():
+    """Retourne le CryptContext unique (passlib importé au premier usage)."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password, hashed_password):
     """Vérifie si un mot de passe en clair correspond au hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
     """Génère un hash pour un mot de passe en clair."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
@@ -17,6 +17,28 @@ class Settings(BaseSettings):
 
     # Configuration de la base de données
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./meter.db")
+    # Connexions du pool : chaque requête en cours en garde une
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+    # Profil de performance SQLite (WAL, pragmas) et file d'écriture
+    SQLITE_PROFILE_ENABLED: bool = (
+        os.getenv("SQLITE_PROFILE_ENABLED", "True") == "True"
+    )
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(
+        os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")
+    )
+    WRITE_QUEUE_ENABLED: bool = (
+        os.getenv("WRITE_QUEUE_ENABLED", "True") == "True"
+    )
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+
+    # Sharding des emplacements et compteurs : URLs des shards, séparées par
+    # des virgules (vide : tout dans DATABASE_URL)
+    SHARD_URLS: str = os.getenv("SHARD_URLS", "")
 
     # Configuration JWT
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your_super_secret_key_here")
@@ -34,6 +56,138 @@ class Settings(BaseSettings):
     )
     INITIAL_ADMIN_NAME: str = os.getenv("INITIAL_ADMIN_NAME", "Administrator")
 
+    # Démarrage : si le marqueur existe (écrit après le premier amorçage ou
+    # par l'outil de migration), le schéma et l'init sont ignorés
+    BOOTSTRAP_MARKER: str = os.getenv(
+        "BOOTSTRAP_MARKER", "./.meter_bootstrapped"
+    )
+    SKIP_DB_INIT: bool = os.getenv("SKIP_DB_INIT", "False") == "True"
+    # Préchauffage (pool DB, JWT, hachage) avant d'accepter du trafic
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "False") == "True"
+    WARMUP_DB_CONNECTIONS: int = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+
+    # Serveur de production (python -m app.serve)
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # 0 = auto
+    KEEP_ALIVE: int = int(os.getenv("KEEP_ALIVE", "75"))
+    BACKLOG: int = int(os.getenv("BACKLOG", "2048"))
+    MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", "0"))  # 0 = jamais
+    MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+    # Validation des lots de relevés : score robuste (MAD) au-delà duquel
+    # un relevé est considéré comme aberrant pour son type de compteur
+    READING_OUTLIER_SCORE: float = float(
+        os.getenv("READING_OUTLIER_SCORE", "10")
+    )
+
+    # Tâches de fond
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    JOB_DRAIN_TIMEOUT: float = float(os.getenv("JOB_DRAIN_TIMEOUT", "30"))
+    # Délai sans signe de vie après lequel une tâche en cours est reprise
+    JOB_STALE_AFTER: int = int(os.getenv("JOB_STALE_AFTER", "300"))
+    # Intervalle du signe de vie émis pendant l'exécution d'une tâche
+    JOB_HEARTBEAT_INTERVAL: float = float(
+        os.getenv("JOB_HEARTBEAT_INTERVAL", "60")
+    )
+
+    # Journal des modifications (/changes)
+    CHANGES_PAGE_SIZE: int = int(os.getenv("CHANGES_PAGE_SIZE", "1000"))
+    CHANGES_RETENTION_DAYS: float = float(
+        os.getenv("CHANGES_RETENTION_DAYS", "30")
+    )
+    CHANGES_COMPACTION_INTERVAL: int = int(
+        os.getenv("CHANGES_COMPACTION_INTERVAL", "3600")
+    )  # 0 = désactivé
+
+    # Recherche des emplacements : "auto" (trigram/FTS5 selon la base)
+    # ou "memory" (index trié en mémoire)
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "auto")
+
+    # Journal d'audit : "database" (table auditevent) ou "file" (JSON lines)
+    AUDIT_SINK: str = os.getenv("AUDIT_SINK", "database")
+    AUDIT_DIR: str = os.getenv("AUDIT_DIR", "./audit")
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_QUEUE_SIZE: int = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+    AUDIT_FILE_MAX_BYTES: int = int(
+        os.getenv("AUDIT_FILE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    AUDIT_FILE_MAX_AGE: int = int(os.getenv("AUDIT_FILE_MAX_AGE", "86400"))
+
+    # Statistiques du parc (/stats) : recalcul périodique, 0 = désactivé
+    STATS_RECONCILE_INTERVAL: int = int(
+        os.getenv("STATS_RECONCILE_INTERVAL", "3600")
+    )
+
+    # Archivage des relevés anciens en Parquet (paquet pyarrow requis) :
+    # âge en jours, répertoire et période de la tâche (0 = désactivée)
+    READINGS_ARCHIVE_DAYS: int = int(os.getenv("READINGS_ARCHIVE_DAYS", "365"))
+    READINGS_ARCHIVE_DIR: str = os.getenv("READINGS_ARCHIVE_DIR", "./archive")
+    READINGS_ARCHIVE_INTERVAL: int = int(
+        os.getenv("READINGS_ARCHIVE_INTERVAL", "0")
+    )
+
+    # Requêtes SQL lentes (seuil en ms, taille du tampon de /admin)
+    SLOW_QUERY_THRESHOLD_MS: float = float(
+        os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")
+    )
+    SLOW_QUERY_BUFFER_SIZE: int = int(
+        os.getenv("SLOW_QUERY_BUFFER_SIZE", "500")
+    )
+
+    # Profilage à la demande (X-Profile: 1 ou ?profile=1, admin seul)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "True") == "True"
+    PROFILING_SAMPLE_INTERVAL_MS: float = float(
+        os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "1")
+    )
+
+    # Compression des réponses (niveaux réduits quand le worker sature)
+    COMPRESSION_ENABLED: bool = (
+        os.getenv("COMPRESSION_ENABLED", "True") == "True"
+    )
+    COMPRESSION_MINIMUM_SIZE: int = int(
+        os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")
+    )
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_LEVEL: int = int(
+        os.getenv("COMPRESSION_BROTLI_LEVEL", "5")
+    )
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    # Nombre de réponses compressées simultanément au-delà duquel le niveau
+    # le plus rapide est utilisé
+    COMPRESSION_SATURATION: int = int(os.getenv("COMPRESSION_SATURATION", "4"))
+
+    # Limitation de débit (requêtes par minute, également taille de rafale)
+    RATE_LIMIT_ENABLED: bool = (
+        os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+    )
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_REDIS_URL: str = os.getenv(
+        "RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"
+    )
+    RATE_LIMIT_LOGIN: int = int(os.getenv("RATE_LIMIT_LOGIN", "10"))
+    RATE_LIMIT_ANONYMOUS: int = int(os.getenv("RATE_LIMIT_ANONYMOUS", "60"))
+    RATE_LIMIT_CONSUMER: int = int(os.getenv("RATE_LIMIT_CONSUMER", "120"))
+    RATE_LIMIT_EMPLOYEE: int = int(os.getenv("RATE_LIMIT_EMPLOYEE", "1200"))
+    RATE_LIMIT_ADMIN: int = int(os.getenv("RATE_LIMIT_ADMIN", "1200"))
+
+    # Délestage adaptatif (503 quand l'attente dépasse la cible)
+    LOAD_SHEDDING_ENABLED: bool = (
+        os.getenv("LOAD_SHEDDING_ENABLED", "True") == "True"
+    )
+    LOAD_SHEDDING_TARGET_MS: int = int(
+        os.getenv("LOAD_SHEDDING_TARGET_MS", "100")
+    )
+    LOAD_SHEDDING_MIN_CONCURRENCY: int = int(
+        os.getenv("LOAD_SHEDDING_MIN_CONCURRENCY", "4")
+    )
+    LOAD_SHEDDING_MAX_CONCURRENCY: int = int(
+        os.getenv("LOAD_SHEDDING_MAX_CONCURRENCY", "256")
+    )
+
 
 @lru_cache()
 def get_settings():
@@ -0,0 +1,226 @@
+# Archivage des relevés anciens en fichiers Parquet (stockage froid)
+import os
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.config import get_settings
+from app.models import MeterReading, MeterType, ReadingHistoryEntry
+
+settings = get_settings()
+
+# Nombre de relevés lus puis archivés par tranche
+ARCHIVE_CHUNK_SIZE = 100_000
+
+# ID par DELETE (limite de paramètres liés de SQLite)
+DELETE_CHUNK_SIZE = 10_000
+
+# Lignes par groupe Parquet : granularité du saut par statistiques min/max
+ROW_GROUP_SIZE = 16_384
+
+
+def partition_path(root: str, meter_type: str, month: str) -> str:
+    """Répertoire d'une partition (format hive : type=.../month=...)."""
+    return os.path.join(root, f"type={meter_type}", f"month={month}")
+
+
+def write_partition(directory: str, table) -> str:
+    """Écrit une table triée par (ean, read_at) dans un nouveau fichier.
+
+    Le fichier est écrit sous un nom temporaire puis renommé : un lecteur
+    ne voit jamais de fichier incomplet.
+    """
+    import pyarrow.parquet as pq  # Dépendance optionnelle
+
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+    path = os.path.join(directory, name + ".parquet")
+    temporary = os.path.join(directory, "." + name + ".tmp")
+    table = table.sort_by([("ean", "ascending"), ("read_at", "ascending")])
+    pq.write_table(
+        table,
+        temporary,
+        compression="zstd",
+        row_group_size=ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+    with open(temporary, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return path
+
+
+def archive_readings(
+    session: Session,
+    older_than: datetime,
+    progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """Déplace les relevés antérieurs à older_than vers l'archive Parquet.
+
+    Chaque tranche est écrite (un fichier par type et par mois) avant
+    d'être supprimée de la table : une interruption entre les deux laisse
+    au pire des relevés en double, ignorés à la lecture.
+    """
+    import pyarrow as pa  # Dépendance optionnelle
+
+    root = settings.READINGS_ARCHIVE_DIR
+    archived, files = 0, 0
+    while True:
+        statement = (
+            select(
+                MeterReading.id,
+                MeterReading.ean,
+                MeterReading.type,
+                MeterReading.reading,
+                MeterReading.read_at,
+            )
+            .where(MeterReading.read_at < older_than)
+            .order_by(MeterReading.id)
+            .limit(ARCHIVE_CHUNK_SIZE)
+        )
+        rows = session.exec(statement).all()
+        if not rows:
+            break
+        ids, eans, types, readings, read_at = zip(*rows)
+        types = np.array([getattr(t, "value", t) for t in types])
+        read_at = np.array(read_at, dtype="datetime64[us]")
+        months = read_at.astype("datetime64[M]").astype(str)
+        table = pa.table(
+            {
+                "ean": pa.array(eans, pa.string()),
+                "reading": pa.array(readings, pa.float64()),
+                "read_at": pa.array(read_at, pa.timestamp("us")),
+            }
+        )
+
+        # Un fichier par partition (type, mois) présente dans la tranche
+        keys = np.char.add(np.char.add(types, "/"), months)
+        for key in np.unique(keys):
+            meter_type, month = key.split("/")
+            rows_mask = pa.array(keys == key)
+            write_partition(
+                partition_path(root, meter_type, month),
+                table.filter(rows_mask),
+            )
+            files += 1
+
+        # Suppression par les ID lus : une ligne validée après la lecture
+        # peut recevoir un ID dans l'intervalle sans avoir été archivée
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            chunk = ids[start : start + DELETE_CHUNK_SIZE]
+            session.execute(
+                delete(MeterReading).where(MeterReading.id.in_(chunk))
+            )
+        session.commit()
+        archived += len(ids)
+        if progress is not None:
+            progress(archived)
+    return {"archived": archived, "files": files}
+
+
+def read_archived_history(
+    ean: str,
+    meter_type: MeterType,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    limit: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Au plus limit relevés archivés d'un compteur, triés par date.
+
+    Les fichiers sont projetés en mémoire (mmap). Les partitions mensuelles
+    sont lues dans l'ordre et la lecture s'arrête dès que limit relevés
+    sont réunis; seuls les groupes de lignes dont les statistiques min/max
+    couvrent l'EAN et la période sont lus.
+    """
+    directory = os.path.join(
+        settings.READINGS_ARCHIVE_DIR, f"type={meter_type.value}"
+    )
+    empty = np.array([], dtype="datetime64[us]"), np.array([])
+    if not os.path.isdir(directory):
+        return empty
+
+    import pyarrow as pa  # Dépendance optionnelle
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+
+    months = sorted(
+        name[len("month=") :]
+        for name in os.listdir(directory)
+        if name.startswith("month=")
+    )
+    if start is not None:
+        months = [month for month in months if month >= f"{start:%Y-%m}"]
+    if end is not None:
+        months = [month for month in months if month <= f"{end:%Y-%m}"]
+
+    condition = ds.field("ean") == ean
+    if start is not None:
+        condition &= ds.field("read_at") >= start
+    if end is not None:
+        condition &= ds.field("read_at") < end
+    tables, count = [], 0
+    for month in months:
+        dataset = ds.dataset(
+            os.path.join(directory, f"month={month}"),
+            format="parquet",
+            filesystem=LocalFileSystem(use_mmap=True),
+        )
+        table = dataset.to_table(
+            columns=["read_at", "reading"], filter=condition
+        )
+        tables.append(table)
+        count += table.num_rows
+        if count >= limit:
+            # Les mois suivants ne contiennent que des relevés plus récents
+            break
+    if not count:
+        return empty
+    table = pa.concat_tables(tables).sort_by("read_at").slice(0, limit)
+    return (
+        table.column("read_at").to_numpy().astype("datetime64[us]"),
+        table.column("reading").to_numpy(),
+    )
+
+
+def read_history(
+    session: Session,
+    ean: str,
+    meter_type: MeterType,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 1000,
+) -> List[ReadingHistoryEntry]:
+    """Historique d'un compteur (archive et table), trié par date."""
+    statement = select(MeterReading.read_at, MeterReading.reading).where(
+        MeterReading.ean == ean
+    )
+    if start is not None:
+        statement = statement.where(MeterReading.read_at >= start)
+    if end is not None:
+        statement = statement.where(MeterReading.read_at < end)
+    statement = statement.order_by(MeterReading.read_at).limit(limit)
+    rows = session.exec(statement).all()
+    hot_read_at = np.array([row[0] for row in rows], dtype="datetime64[us]")
+    hot_readings = np.array([row[1] for row in rows], dtype=float)
+
+    archived_read_at, archived_readings = read_archived_history(
+        ean, meter_type, start, end, limit
+    )
+    read_at = np.concatenate([archived_read_at, hot_read_at])
+    readings = np.concatenate([archived_readings, hot_readings])
+
+    # Tri par date, puis suppression des doublons d'un archivage interrompu
+    order = np.lexsort((readings, read_at))
+    read_at, readings = read_at[order], readings[order]
+    keep = np.ones(len(read_at), dtype=bool)
+    keep[1:] = (read_at[1:] != read_at[:-1]) | (readings[1:] != readings[:-1])
+    return [
+        ReadingHistoryEntry(reading=reading, read_at=moment)
+        for reading, moment in zip(
+            readings[keep][:limit].tolist(), read_at[keep][:limit].tolist()
+        )
+    ]
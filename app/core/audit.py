@@ -0,0 +1,264 @@
+# Journal d'audit asynchrone : événements mis en file, écrits par lots
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.config import get_settings
+from app.database import engine
+from app.models import AuditEvent, ChangeOperation
+
+settings = get_settings()
+
+# Champs jamais copiés dans le journal
+REDACTED_FIELDS = {"password"}
+# Valeur notée à la place d'un champ masqué modifié
+REDACTED = "***"
+
+
+def snapshot(model: SQLModel) -> Dict[str, Any]:
+    """État sérialisable d'une entité, sans les champs sensibles."""
+    return model.model_dump(mode="json", exclude=REDACTED_FIELDS)
+
+
+def diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, list]:
+    """Champs modifiés sous la forme {champ: [ancienne, nouvelle valeur]}."""
+    return {
+        field: [before.get(field), after.get(field)]
+        for field in before.keys() | after.keys()
+        if before.get(field) != after.get(field)
+    }
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class DatabaseAuditSink:
+    """Écrit les événements dans la table auditevent (INSERT groupé)."""
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        with Session(engine) as session:
+            session.execute(insert(AuditEvent), events)
+            session.commit()
+
+    def close(self) -> None:
+        pass
+
+
+class FileAuditSink:
+    """Écrit les événements en JSON lines dans des fichiers en ajout seul.
+
+    Un nouveau fichier est ouvert quand le courant dépasse
+    AUDIT_FILE_MAX_BYTES ou AUDIT_FILE_MAX_AGE secondes. Chaque lot est
+    synchronisé sur disque (fsync) avant d'être considéré comme écrit.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._file = None
+        self._opened_at = 0.0
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        if self._should_rotate():
+            self._rotate()
+        lines = "".join(
+            json.dumps(event, default=_json_default, ensure_ascii=False) + "\n"
+            for event in events
+        )
+        self._file.write(lines)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _should_rotate(self) -> bool:
+        if self._file is None:
+            return True
+        too_old = time.monotonic() - self._opened_at
+        return (
+            self._file.tell() >= settings.AUDIT_FILE_MAX_BYTES
+            or too_old >= settings.AUDIT_FILE_MAX_AGE
+        )
+
+    def _rotate(self) -> None:
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"audit-{stamp}.jsonl")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(
+                self.directory, f"audit-{stamp}-{suffix}.jsonl"
+            )
+            suffix += 1
+        self._file = open(path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+
+def create_audit_sink():
+    """Crée la destination configurée (base de données par défaut)."""
+    if settings.AUDIT_SINK == "file":
+        return FileAuditSink(settings.AUDIT_DIR)
+    return DatabaseAuditSink()
+
+
+class AuditLog:
+    """File bornée d'événements d'audit vidée par une tâche de fond.
+
+    record() ne fait qu'ajouter l'événement en mémoire : l'écriture a lieu
+    hors de la transaction de la requête, par lots de AUDIT_BATCH_SIZE ou
+    toutes les AUDIT_FLUSH_INTERVAL secondes, dans un thread. La file ne
+    dépasse jamais AUDIT_QUEUE_SIZE événements : au-delà (destination en
+    panne), les plus récents sont perdus et comptés dans dropped. stop()
+    écrit le reliquat.
+    """
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.dropped = 0  # Événements perdus, file pleine
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Préserve l'ordre des lots
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def record(
+        self,
+        principal_id: Optional[int],
+        entity: str,
+        entity_id,
+        action: ChangeOperation,
+        changes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Met en file un événement (après le commit de la modification)."""
+        self.record_each(principal_id, entity, [entity_id], action, changes)
+
+    def record_each(
+        self,
+        principal_id: Optional[int],
+        entity: str,
+        entity_ids: Iterable,
+        action: ChangeOperation,
+        changes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Met en file un événement par entité d'une opération groupée."""
+        occurred_at = datetime.utcnow()
+        self.record_many(
+            {
+                "occurred_at": occurred_at,
+                "principal_id": principal_id,
+                "entity": entity,
+                "entity_id": str(entity_id),
+                "action": action,
+                "changes": changes or {},
+            }
+            for entity_id in entity_ids
+        )
+
+    def record_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Met en file plusieurs événements déjà construits."""
+        with self._lock:
+            self._events.extend(events)
+            pending = len(self._events)
+            self._drop_overflow()
+        if self._task is None:
+            # Écrivain arrêté (scripts, démarrage) : écriture par l'appelant
+            try:
+                self.flush()
+            except Exception:
+                # La modification est validée : ne pas faire échouer
+                # l'appelant, les événements restent en file
+                pass
+        elif pending >= settings.AUDIT_BATCH_SIZE:
+            self._wake()
+
+    def _drop_overflow(self) -> None:
+        # Appelé sous self._lock : borne la file en perdant les plus récents
+        limit = settings.AUDIT_QUEUE_SIZE
+        overflow = len(self._events) - limit
+        if overflow <= 0:
+            return
+        del self._events[limit:]
+        if not self.dropped:
+            print("File d'audit pleine : événements perdus")
+        self.dropped += overflow
+
+    def flush(self) -> int:
+        """Écrit tous les événements en attente; retourne leur nombre."""
+        with self._write_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            if self.sink is None:
+                self.sink = create_audit_sink()
+            count = len(events)
+            try:
+                while events:
+                    chunk = events[: settings.AUDIT_BATCH_SIZE]
+                    self.sink.write(chunk)
+                    del events[: len(chunk)]
+            except Exception as exc:
+                # Remettre en tête les événements non écrits
+                print(f"Échec de l'écriture du journal d'audit: {exc}")
+                with self._lock:
+                    self._events[:0] = events
+                    self._drop_overflow()
+                raise
+            return count
+
+    async def start(self) -> None:
+        """Démarre l'écrivain de fond."""
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Arrête l'écrivain et écrit tous les événements restants."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake()
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self.flush)
+        if self.sink is not None:
+            self.sink.close()
+
+    def _wake(self) -> None:
+        # record() peut être appelé depuis un thread (file d'écriture)
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.AUDIT_FLUSH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                # Événements conservés en file, nouvel essai au prochain tour
+                pass
+
+
+# Instance unique, démarrée et vidée par le lifespan de l'application
+audit_log = AuditLog()
@@ -0,0 +1,101 @@
+# Opérations groupées ensemblistes (une requête UPDATE/DELETE par opération)
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import delete, exists, update
+from sqlmodel import Session, select
+
+from app.core.changes import record_change, record_changes_from_select
+from app.core.stats import close_location_stats, delete_location_stats
+from app.models import ChangeOperation, Location, Meter, MeterStatus
+
+
+def location_exists(session: Session, location_id: int) -> bool:
+    """Vérifie par EXISTS si l'emplacement existe."""
+    statement = select(exists().where(Location.id == location_id))
+    return session.exec(statement).one()
+
+
+def location_has_meters(session: Session, location_id: int) -> bool:
+    """Vérifie par EXISTS si l'emplacement possède des compteurs."""
+    statement = select(exists().where(Meter.location_id == location_id))
+    return session.exec(statement).one()
+
+
+def close_location_meters(session: Session, location_id: int) -> List[str]:
+    """Ferme tous les compteurs ouverts d'un emplacement (sans commit).
+
+    Retourne les EAN des compteurs fermés.
+    """
+    criteria = (Meter.location_id == location_id) & (
+        Meter.status == MeterStatus.OPEN
+    )
+    eans = record_changes_from_select(
+        session, "meter", Meter.ean, criteria, ChangeOperation.UPDATE
+    )
+    close_location_stats(session, location_id)
+    statement = (
+        update(Meter)
+        .where(criteria)
+        .values(status=MeterStatus.CLOSE, last_update=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(statement)
+    return eans
+
+
+def transfer_locations(
+    session: Session, source_user_id: int, target_user_id: int
+) -> List[str]:
+    """Transfère tous les emplacements d'un utilisateur (sans commit).
+
+    Retourne les ID des emplacements transférés.
+    """
+    location_ids = record_changes_from_select(
+        session,
+        "location",
+        Location.id,
+        Location.user_id == source_user_id,
+        ChangeOperation.UPDATE,
+    )
+    statement = (
+        update(Location)
+        .where(Location.user_id == source_user_id)
+        .values(user_id=target_user_id)
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(statement)
+    return location_ids
+
+
+def delete_location(
+    session: Session, location_id: int, cascade: bool = False
+) -> List[str]:
+    """Supprime un emplacement, et ses compteurs si cascade (sans commit).
+
+    Retourne les EAN des compteurs supprimés.
+    """
+    deleted = []
+    if cascade:
+        deleted = record_changes_from_select(
+            session,
+            "meter",
+            Meter.ean,
+            Meter.location_id == location_id,
+            ChangeOperation.DELETE,
+        )
+        meters_statement = (
+            delete(Meter)
+            .where(Meter.location_id == location_id)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(meters_statement)
+        delete_location_stats(session, location_id)
+    record_change(session, "location", location_id, ChangeOperation.DELETE)
+    location_statement = (
+        delete(Location)
+        .where(Location.id == location_id)
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(location_statement)
+    return deleted
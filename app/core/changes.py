@@ -0,0 +1,135 @@
+# Journal des modifications pour la synchronisation incrémentale
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, cast, delete, exists, func, insert, literal
+from sqlmodel import Session, select
+
+from app.core.sharding import is_sharded
+from app.database import engine
+from app.models import ChangeLog, ChangeOperation
+
+changelog = ChangeLog.__table__
+
+# Verrou consultatif PostgreSQL sérialisant les écritures du journal
+CHANGES_LOCK_KEY = 0x6368616E6765
+
+
+def lock_changes(session: Session) -> None:
+    """Sérialise les transactions qui écrivent dans le journal.
+
+    Verrou tenu jusqu'à la fin de la transaction : les ID sont attribués
+    dans l'ordre de validation, et un curseur ne peut pas dépasser une
+    transaction encore en cours. SQLite n'a qu'un écrivain à la fois.
+    """
+    if engine.dialect.name == "postgresql":
+        session.execute(select(func.pg_advisory_xact_lock(CHANGES_LOCK_KEY)))
+
+
+def record_change(
+    session: Session, entity: str, entity_id, operation: ChangeOperation
+) -> None:
+    """Journalise une modification dans la transaction en cours."""
+    lock_changes(session)
+    session.add(
+        ChangeLog(entity=entity, entity_id=str(entity_id), operation=operation)
+    )
+
+
+def record_changes(
+    session: Session,
+    entity: str,
+    entity_ids: Iterable,
+    operation: ChangeOperation,
+) -> None:
+    """Journalise plusieurs modifications en un seul INSERT groupé."""
+    changed_at = datetime.utcnow()
+    rows = [
+        {
+            "entity": entity,
+            "entity_id": str(entity_id),
+            "operation": operation,
+            "changed_at": changed_at,
+        }
+        for entity_id in entity_ids
+    ]
+    if rows:
+        lock_changes(session)
+        session.execute(insert(changelog), rows)
+
+
+def record_changes_from_select(
+    session: Session,
+    entity: str,
+    id_column,
+    where_clause,
+    operation: ChangeOperation,
+) -> List[str]:
+    """Journalise par INSERT ... SELECT les lignes d'un UPDATE/DELETE.
+
+    À appeler avant l'opération ensembliste, avec le même critère.
+    Retourne les ID journalisés (pour l'audit).
+    """
+    lock_changes(session)
+    if is_sharded(session):
+        # Lignes sur un shard, journal sur la base globale : deux requêtes
+        entity_ids = session.exec(select(id_column).where(where_clause)).all()
+        record_changes(session, entity, entity_ids, operation)
+        return [str(entity_id) for entity_id in entity_ids]
+    rows = select(
+        literal(entity, String),
+        cast(id_column, String),
+        literal(operation, changelog.c.operation.type),
+        literal(datetime.utcnow(), changelog.c.changed_at.type),
+    ).where(where_clause)
+    statement = (
+        insert(ChangeLog)
+        .from_select(["entity", "entity_id", "operation", "changed_at"], rows)
+        .returning(changelog.c.entity_id)
+    )
+    return list(session.execute(statement).scalars())
+
+
+def read_changes(
+    session: Session, since: int, limit: int
+) -> Tuple[List[ChangeLog], bool]:
+    """Lit au plus limit entrées après le curseur since.
+
+    Les écritures du journal étant sérialisées (lock_changes), aucune
+    transaction ne peut encore valider un ID inférieur au dernier visible.
+    """
+    statement = (
+        select(ChangeLog)
+        .where(ChangeLog.id > since)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+    )
+    changes = session.exec(statement).all()
+    return changes[:limit], len(changes) > limit
+
+
+def compact_changes(
+    session: Session,
+    older_than: datetime,
+    check_cancelled: Optional[Callable[[], None]] = None,
+) -> int:
+    """Supprime les entrées anciennes remplacées par une plus récente.
+
+    La dernière entrée de chaque entité est conservée (y compris les
+    suppressions) : un consommateur en retard reçoit toujours l'état final.
+    check_cancelled est appelée avant le commit (annulation d'une tâche).
+    """
+    newer = changelog.alias("newer")
+    statement = delete(changelog).where(
+        (changelog.c.changed_at < older_than)
+        & exists().where(
+            (newer.c.entity == changelog.c.entity)
+            & (newer.c.entity_id == changelog.c.entity_id)
+            & (newer.c.id > changelog.c.id)
+        )
+    )
+    deleted = session.execute(statement).rowcount
+    if check_cancelled is not None:
+        check_cancelled()
+    session.commit()
+    return deleted
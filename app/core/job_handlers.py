@@ -0,0 +1,167 @@
+# Tâches de fond disponibles (enregistrées à l'import du module)
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.config import get_settings
+from app.core import bulk
+from app.core.audit import audit_log
+from app.core.changes import compact_changes
+from app.core.jobs import JobContext, job_handler
+from app.core.sharding import is_sharded
+from app.core.stats import reconcile_meter_stats
+from app.models import (
+    ChangeOperation,
+    Meter,
+    MeterRead,
+    MeterReading,
+    MeterStatus,
+    User,
+    UserRole,
+)
+
+settings = get_settings()
+
+# Nombre de compteurs lus par tranche lors d'un export
+EXPORT_CHUNK_SIZE = 1000
+
+
+@job_handler("location.close_meters")
+def close_location_meters(ctx: JobContext, params: Dict[str, Any]):
+    """Ferme tous les compteurs ouverts d'un emplacement."""
+    location_id = int(params["location_id"])
+    if not bulk.location_exists(ctx.session, location_id):
+        raise ValueError(f"Emplacement avec l'ID {location_id} non trouvé")
+    ctx.check_cancelled()
+    eans = bulk.close_location_meters(ctx.session, location_id)
+    # Annulation ou arrêt pendant l'UPDATE : rien n'est validé
+    ctx.check_cancelled()
+    ctx.session.commit()
+    audit_log.record(
+        ctx.owner_id,
+        "location",
+        location_id,
+        ChangeOperation.UPDATE,
+        {"operation": "meters:close", "affected": len(eans)},
+    )
+    audit_log.record_each(
+        ctx.owner_id,
+        "meter",
+        eans,
+        ChangeOperation.UPDATE,
+        {"status": [MeterStatus.OPEN.value, MeterStatus.CLOSE.value]},
+    )
+    return {"affected": len(eans)}
+
+
+@job_handler("user.transfer_locations")
+def transfer_locations(ctx: JobContext, params: Dict[str, Any]):
+    """Transfère tous les emplacements d'un utilisateur vers un autre."""
+    source_user_id = int(params["source_user_id"])
+    target_user_id = int(params["target_user_id"])
+    statement = select(User.role).where(User.id == target_user_id)
+    if ctx.session.exec(statement).first() != UserRole.CONSUMER:
+        raise ValueError("L'utilisateur cible doit être un consommateur")
+    location_ids = bulk.transfer_locations(
+        ctx.session, source_user_id, target_user_id
+    )
+    ctx.session.commit()
+    audit_log.record(
+        ctx.owner_id,
+        "user",
+        source_user_id,
+        ChangeOperation.UPDATE,
+        {
+            "operation": "locations:transfer",
+            "target_user_id": target_user_id,
+            "affected": len(location_ids),
+        },
+    )
+    audit_log.record_each(
+        ctx.owner_id,
+        "location",
+        location_ids,
+        ChangeOperation.UPDATE,
+        {"user_id": [source_user_id, target_user_id]},
+    )
+    return {"affected": len(location_ids)}
+
+
+@job_handler("meter.export")
+def export_meters(ctx: JobContext, params: Dict[str, Any]):
+    """Exporte les compteurs (éventuellement d'un seul emplacement)."""
+    location_id = params.get("location_id")
+    base = select(Meter).order_by(Meter.ean)
+    count = select(func.count()).select_from(Meter)
+    if location_id is not None:
+        base = base.where(Meter.location_id == int(location_id))
+        count = count.where(Meter.location_id == int(location_id))
+    # Une ligne par shard interrogé
+    total = sum(ctx.session.exec(count).all())
+
+    # Pagination par clé (EAN) pour ne pas relire les tranches précédentes
+    exported, last_ean = [], None
+    while True:
+        statement = base.limit(EXPORT_CHUNK_SIZE)
+        if last_ean is not None:
+            statement = statement.where(Meter.ean > last_ean)
+        meters = ctx.session.exec(statement).all()
+        if is_sharded(ctx.session):
+            # Tranches concaténées des shards : la suite de la pagination
+            # part du dernier EAN des premiers EXPORT_CHUNK_SIZE en ordre
+            meters = sorted(meters, key=lambda meter: meter.ean)
+            meters = meters[:EXPORT_CHUNK_SIZE]
+        if not meters:
+            break
+        exported.extend(
+            MeterRead.model_validate(meter).model_dump(mode="json")
+            for meter in meters
+        )
+        last_ean = meters[-1].ean
+        ctx.report_progress(len(exported) / max(total, 1))
+    return exported
+
+
+@job_handler("changes.compact", roles=(UserRole.ADMIN,))
+def compact_change_log(ctx: JobContext, params: Dict[str, Any]):
+    """Compacte les entrées anciennes du journal des modifications."""
+    retention_days = params.get(
+        "retention_days", settings.CHANGES_RETENTION_DAYS
+    )
+    older_than = datetime.utcnow() - timedelta(days=float(retention_days))
+    ctx.check_cancelled()
+    deleted = compact_changes(
+        ctx.session, older_than, check_cancelled=ctx.check_cancelled
+    )
+    return {"deleted": deleted}
+
+
+@job_handler("stats.reconcile", roles=(UserRole.ADMIN,))
+def reconcile_stats(ctx: JobContext, params: Dict[str, Any]):
+    """Recalcule les statistiques du parc pour corriger les dérives."""
+    ctx.check_cancelled()
+    return reconcile_meter_stats(
+        ctx.session, check_cancelled=ctx.check_cancelled
+    )
+
+
+@job_handler("readings.archive", roles=(UserRole.ADMIN,))
+def archive_old_readings(ctx: JobContext, params: Dict[str, Any]):
+    """Archive en Parquet les relevés plus anciens que l'horizon."""
+    from app.core.archive import archive_readings  # Import différé (NumPy)
+
+    days = params.get("days", settings.READINGS_ARCHIVE_DAYS)
+    older_than = datetime.utcnow() - timedelta(days=float(days))
+    statement = (
+        select(func.count())
+        .select_from(MeterReading)
+        .where(MeterReading.read_at < older_than)
+    )
+    total = ctx.session.exec(statement).one()
+    return archive_readings(
+        ctx.session,
+        older_than,
+        progress=lambda archived: ctx.report_progress(archived / total),
+    )
@@ -0,0 +1,333 @@
+# Exécution des tâches de fond (exports, opérations de masse, etc.)
+import asyncio
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.config import get_settings
+from app.core.sharding import open_session
+from app.database import engine
+from app.models import Job, JobStatus, UserRole
+
+settings = get_settings()
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche dont l'annulation a été demandée."""
+
+
+class JobInterrupted(JobCancelled):
+    """Levée dans une tâche interrompue par l'arrêt du worker."""
+
+
+# Gestionnaires enregistrés : type de tâche -> (fonction, rôles autorisés)
+JOB_HANDLERS: Dict[str, tuple] = {}
+
+
+def job_handler(
+    kind: str,
+    roles: Iterable[UserRole] = (UserRole.EMPLOYEE, UserRole.ADMIN),
+):
+    """Enregistre une fonction handler(ctx, params) pour un type de tâche."""
+
+    def register(handler: Callable[["JobContext", Dict[str, Any]], Any]):
+        JOB_HANDLERS[kind] = (handler, tuple(roles))
+        return handler
+
+    return register
+
+
+class JobContext:
+    """Contexte fourni à une tâche : session, progression et annulation."""
+
+    def __init__(
+        self,
+        job_id: str,
+        session: Session,
+        runner: "JobRunner",
+        owner_id: Optional[int] = None,
+    ):
+        self.job_id = job_id
+        self.session = session
+        self.runner = runner
+        self.owner_id = owner_id  # Auteur de la tâche, pour l'audit
+
+    def report_progress(self, progress: float) -> None:
+        """Enregistre la progression (0 à 1) et vérifie l'annulation."""
+        with Session(engine) as session:
+            job = session.get(Job, self.job_id)
+            job.progress = min(max(progress, 0.0), 1.0)
+            job.heartbeat_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            cancel_requested = job.cancel_requested
+        self._raise_if_stopped(cancel_requested)
+
+    def check_cancelled(self) -> None:
+        """Lève JobCancelled si l'annulation a été demandée."""
+        with Session(engine) as session:
+            statement = select(Job.cancel_requested).where(
+                Job.id == self.job_id
+            )
+            cancel_requested = session.exec(statement).one()
+        self._raise_if_stopped(cancel_requested)
+
+    def _raise_if_stopped(self, cancel_requested: bool) -> None:
+        if cancel_requested:
+            raise JobCancelled()
+        if self.runner.interrupting:
+            raise JobInterrupted()
+
+
+def submit_job(
+    session: Session,
+    kind: str,
+    params: Dict[str, Any],
+    owner_id: Optional[int] = None,
+) -> Job:
+    """Persiste une nouvelle tâche et réveille les workers."""
+    job = Job(kind=kind, params=params, owner_id=owner_id)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    job_runner.wake()
+    return job
+
+
+def request_cancellation(session: Session, job: Job) -> Job:
+    """Annule une tâche en attente ou demande l'arrêt d'une tâche lancée."""
+    if job.status == JobStatus.PENDING:
+        job.status = JobStatus.CANCELLED
+        job.finished_at = datetime.utcnow()
+    elif job.status == JobStatus.RUNNING:
+        job.cancel_requested = True
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+class JobRunner:
+    """Pool borné de workers asynchrones exécutant les tâches persistées.
+
+    Les tâches sont réclamées en base par un UPDATE conditionnel, ce qui
+    permet à plusieurs processus de partager la même file. Les fonctions
+    des tâches (synchrones) s'exécutent dans des threads.
+    """
+
+    def __init__(self):
+        self.interrupting = False
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: list = []
+        self._schedules: Dict[str, tuple] = {}
+        self._schedulers: list = []
+
+    async def start(self) -> None:
+        """Reprend les tâches abandonnées et démarre les workers."""
+        self.interrupting = False
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._recover_stale_jobs)
+        self._workers = [
+            asyncio.create_task(self._work())
+            for _ in range(settings.JOB_WORKERS)
+        ]
+        self._schedulers = [
+            asyncio.create_task(self._repeat(kind, interval, params))
+            for kind, (interval, params) in self._schedules.items()
+        ]
+
+    def schedule(
+        self,
+        kind: str,
+        interval: float,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Soumet périodiquement une tâche (à appeler avant start)."""
+        self._schedules[kind] = (interval, params or {})
+
+    async def stop(self) -> None:
+        """Termine les tâches en cours, puis interrompt les retardataires.
+
+        Les tâches interrompues repassent en attente et seront reprises au
+        prochain démarrage; celles qui n'ont pas commencé restent en base.
+        """
+        if not self._workers:
+            return
+        self._stopping = True
+        for scheduler in self._schedulers:
+            scheduler.cancel()
+        self._schedulers = []
+        self.wake()
+        _, pending = await asyncio.wait(
+            self._workers, timeout=settings.JOB_DRAIN_TIMEOUT
+        )
+        if pending:
+            # Les tâches s'arrêteront au prochain appel à report_progress
+            self.interrupting = True
+            await asyncio.wait(pending, timeout=settings.JOB_DRAIN_TIMEOUT)
+        self._workers = []
+
+    def wake(self) -> None:
+        """Signale aux workers qu'une tâche est disponible."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            job_id = await asyncio.to_thread(self._claim_next)
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), settings.JOB_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await asyncio.to_thread(self._run, job_id)
+
+    async def _repeat(
+        self, kind: str, interval: float, params: Dict[str, Any]
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self._submit_scheduled, kind, params)
+
+    def _submit_scheduled(self, kind: str, params: Dict[str, Any]) -> None:
+        """Soumet une tâche planifiée sauf si une autre est déjà en cours.
+
+        Plusieurs workers peuvent planifier la même tâche : la vérification
+        évite d'en empiler des exécutions concurrentes.
+        """
+        with Session(engine) as session:
+            statement = select(Job.id).where(
+                (Job.kind == kind)
+                & Job.status.in_([JobStatus.PENDING, JobStatus.RUNNING])
+            )
+            if session.exec(statement).first() is None:
+                submit_job(session, kind, params)
+
+    def _recover_stale_jobs(self) -> None:
+        """Remet en attente les tâches dont le worker a disparu."""
+        stale_before = datetime.utcnow() - timedelta(
+            seconds=settings.JOB_STALE_AFTER
+        )
+        statement = (
+            update(Job)
+            .where(
+                (Job.status == JobStatus.RUNNING)
+                & (Job.heartbeat_at < stale_before)
+            )
+            .values(status=JobStatus.PENDING)
+        )
+        with Session(engine) as session:
+            session.execute(statement)
+            session.commit()
+
+    def _claim_next(self) -> Optional[str]:
+        """Réclame la plus ancienne tâche en attente, ou retourne None."""
+        with Session(engine) as session:
+            statement = (
+                select(Job.id)
+                .where(Job.status == JobStatus.PENDING)
+                .order_by(Job.created_at)
+                .limit(5)
+            )
+            for job_id in session.exec(statement).all():
+                now = datetime.utcnow()
+                claim = (
+                    update(Job)
+                    .where(
+                        (Job.id == job_id) & (Job.status == JobStatus.PENDING)
+                    )
+                    .values(
+                        status=JobStatus.RUNNING,
+                        started_at=now,
+                        heartbeat_at=now,
+                    )
+                )
+                claimed = session.execute(claim).rowcount == 1
+                session.commit()
+                if claimed:
+                    return job_id
+        return None
+
+    @contextmanager
+    def _heartbeat(self, job_id: str):
+        """Rafraîchit heartbeat_at tant que la tâche s'exécute.
+
+        Les tâches qui n'appellent jamais report_progress seraient sinon
+        considérées abandonnées après JOB_STALE_AFTER et relancées.
+        """
+        done = threading.Event()
+
+        def beat() -> None:
+            while not done.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                try:
+                    with Session(engine) as session:
+                        session.execute(
+                            update(Job)
+                            .where(
+                                (Job.id == job_id)
+                                & (Job.status == JobStatus.RUNNING)
+                            )
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                        session.commit()
+                except Exception as exc:
+                    print(f"Signe de vie de la tâche {job_id} perdu: {exc}")
+
+        thread = threading.Thread(
+            target=beat, name=f"job-heartbeat-{job_id}", daemon=True
+        )
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _run(self, job_id: str) -> None:
+        """Exécute une tâche réclamée et enregistre son issue."""
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            kind, params = job.kind, dict(job.params or {})
+            owner_id = job.owner_id
+
+        try:
+            if kind not in JOB_HANDLERS:
+                raise ValueError(f"Type de tâche inconnu: {kind}")
+            handler, _ = JOB_HANDLERS[kind]
+            with self._heartbeat(job_id), open_session() as session:
+                context = JobContext(job_id, session, self, owner_id)
+                result = handler(context, params)
+            values = {
+                "status": JobStatus.SUCCEEDED,
+                "progress": 1.0,
+                "result": result,
+            }
+        except JobInterrupted:
+            values = {"status": JobStatus.PENDING, "started_at": None}
+        except JobCancelled:
+            values = {"status": JobStatus.CANCELLED}
+        except Exception as exc:
+            print(f"Échec de la tâche {job_id} ({kind}): {exc}")
+            values = {"status": JobStatus.FAILED, "error": str(exc)}
+        if values["status"] != JobStatus.PENDING:
+            values["finished_at"] = datetime.utcnow()
+
+        with Session(engine) as session:
+            session.execute(
+                update(Job).where(Job.id == job_id).values(**values)
+            )
+            session.commit()
+
+
+# Instance unique, démarrée et arrêtée par le lifespan de l'application
+job_runner = JobRunner()
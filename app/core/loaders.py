@@ -0,0 +1,102 @@
+# Chargement groupé des entités liées (une requête par relation)
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+from sqlalchemy.orm import noload
+from sqlmodel import Session, select
+
+from app.models import Location, Meter, MeterRead, User, UserRead
+
+# Nombre de clés par requête IN (limite de paramètres de SQLite)
+LOAD_CHUNK_SIZE = 10_000
+
+# Relations disponibles pour ?expand= sur les emplacements
+LOCATION_EXPANSIONS = ("meters", "user")
+
+# Les relations des modèles sont chargées en selectin : les lectures qui
+# n'en ont pas besoin les désactivent
+LOCATION_WITHOUT_RELATIONS = (noload(Location.user), noload(Location.meters))
+
+
+class BatchLoader:
+    """Charge des valeurs par clé, en une requête par lot (style DataLoader).
+
+    fetch(session, keys) retourne {clé: valeur} pour les clés trouvées. Les
+    valeurs déjà chargées sont mises en cache pour la durée du loader.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        fetch: Callable[[Session, List[Hashable]], Dict[Hashable, Any]],
+        default: Callable[[], Any] = lambda: None,
+    ):
+        self.session = session
+        self.fetch = fetch
+        self.default = default
+        self.cache: Dict[Hashable, Any] = {}
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        """Valeurs des clés, dans l'ordre (défaut si absente)."""
+        keys = list(keys)
+        missing = [
+            key
+            for key in dict.fromkeys(keys)
+            if key is not None and key not in self.cache
+        ]
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            chunk = missing[start : start + LOAD_CHUNK_SIZE]
+            found = self.fetch(self.session, chunk)
+            for key in chunk:
+                self.cache[key] = found.get(key, self.default())
+        return [
+            self.cache[key] if key is not None else self.default()
+            for key in keys
+        ]
+
+
+def fetch_meters_by_location(
+    session: Session, location_ids: List[int]
+) -> Dict[int, List[MeterRead]]:
+    """Compteurs de plusieurs emplacements, groupés par emplacement."""
+    statement = (
+        select(Meter)
+        .where(Meter.location_id.in_(location_ids))
+        .order_by(Meter.ean)
+    )
+    meters = defaultdict(list)
+    for meter in session.exec(statement):
+        meters[meter.location_id].append(MeterRead.model_validate(meter))
+    return meters
+
+
+def fetch_users(session: Session, user_ids: List[int]) -> Dict[int, UserRead]:
+    """Utilisateurs par ID, sans leurs emplacements."""
+    statement = (
+        select(User)
+        .where(User.id.in_(user_ids))
+        .options(noload(User.locations))
+    )
+    return {
+        user.id: UserRead.model_validate(user)
+        for user in session.exec(statement)
+    }
+
+
+def expand_locations(
+    session: Session, locations: List[Location], expand: Iterable[str]
+) -> List[Dict[str, Any]]:
+    """Relations demandées de chaque emplacement, une requête par relation."""
+    expand = set(expand)
+    expansions = [{} for _ in locations]
+    if "meters" in expand:
+        loader = BatchLoader(session, fetch_meters_by_location, list)
+        meters = loader.load_many(location.id for location in locations)
+        for extra, location_meters in zip(expansions, meters):
+            extra["meters"] = location_meters
+    if "user" in expand:
+        loader = BatchLoader(session, fetch_users)
+        users = loader.load_many(location.user_id for location in locations)
+        for extra, user in zip(expansions, users):
+            extra["user"] = user
+    return expansions
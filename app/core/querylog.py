@@ -0,0 +1,103 @@
+# Journal des requêtes SQL lentes et capture des requêtes par requête HTTP
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Longueur maximale d'une instruction conservée
+STATEMENT_MAX_LENGTH = 2000
+
+# Requêtes de la requête HTTP profilée en cours (None : pas de capture)
+captured_queries: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "captured_queries", default=None
+)
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Remplace les valeurs liées par leur type (jamais de données)."""
+    if executemany:
+        return f"<{len(parameters)} lots>"
+    if isinstance(parameters, dict):
+        return {
+            key: f"<{type(value).__name__}>"
+            for key, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return "<masqué>"
+
+
+class SlowQueryLog:
+    """Tampon circulaire des dernières requêtes SQL lentes."""
+
+    def __init__(self, size: int):
+        self._entries: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entrées de la plus récente à la plus ancienne."""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_BUFFER_SIZE)
+
+
+def install_query_log(engine) -> None:
+    """Mesure chaque requête du moteur (événements de curseur)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(
+            time.perf_counter()
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        started_at = conn.info["query_started_at"].pop()
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        captured = captured_queries.get()
+        slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+        if captured is None and not slow:
+            return
+
+        entry = {
+            "statement": statement[:STATEMENT_MAX_LENGTH],
+            "parameters": redact_parameters(parameters, executemany),
+            "duration_ms": round(duration_ms, 3),
+            "occurred_at": datetime.utcnow(),
+        }
+        if captured is not None:
+            captured.append(entry)
+        if slow:
+            slow_query_log.add(entry)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(context):
+        # Instruction en échec : after_cursor_execute n'est pas appelé
+        conn = context.connection
+        if conn is None or context.execution_context is None:
+            return
+        started = conn.info.get("query_started_at")
+        if started:
+            started.pop()
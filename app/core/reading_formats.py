@@ -0,0 +1,155 @@
+# Décodage des lots de relevés binaires (MessagePack, Protobuf) en colonnes
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.models import ReadingBatch
+
+# Colonnes d'un lot : (EAN, valeurs, dates de relevé)
+ReadingColumns = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack"}
+PROTOBUF_CONTENT_TYPES = {"application/protobuf", "application/x-protobuf"}
+
+# Types de fil Protobuf utilisés par app/proto/readings.proto
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LENGTH_DELIMITED = 2
+
+
+class ReadingFormatError(ValueError):
+    """Lot binaire mal formé."""
+
+
+def to_columns(
+    eans: list, readings: np.ndarray, read_at: Optional[np.ndarray]
+) -> ReadingColumns:
+    """Aligne les colonnes décodées (date 0 ou absente : réception)."""
+    count = len(eans)
+    if len(readings) != count:
+        raise ReadingFormatError(
+            "Colonnes eans et readings de tailles différentes"
+        )
+    now = np.datetime64(datetime.utcnow(), "us")
+    if read_at is None or len(read_at) == 0:
+        dates = np.full(count, now)
+    elif len(read_at) != count:
+        raise ReadingFormatError(
+            "Colonnes eans et read_at de tailles différentes"
+        )
+    else:
+        read_at = np.asarray(read_at, dtype=np.int64)
+        dates = np.where(read_at == 0, now, read_at.astype("datetime64[us]"))
+    return (
+        np.array(eans, dtype=object),
+        np.asarray(readings, dtype=float),
+        dates,
+    )
+
+
+def decode_json(body: bytes) -> ReadingColumns:
+    """Décode un lot JSON {"readings": [{"ean", "reading", "read_at"}]}.
+
+    Lève pydantic.ValidationError si le lot ne respecte pas le schéma.
+    """
+    batch = ReadingBatch.model_validate_json(body)
+    now = datetime.utcnow()
+    read_at = [
+        (
+            reading.read_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if reading.read_at and reading.read_at.tzinfo
+            else reading.read_at or now
+        )
+        for reading in batch.readings
+    ]
+    return (
+        np.array([reading.ean for reading in batch.readings], dtype=object),
+        np.array([reading.reading for reading in batch.readings]),
+        np.array(read_at, dtype="datetime64[us]"),
+    )
+
+
+def decode_msgpack(body: bytes) -> ReadingColumns:
+    """Décode {"eans": [...], "readings": [...], "read_at": [...]}.
+
+    read_at (facultatif) contient des microsecondes depuis l'epoch UTC.
+    """
+    import msgpack  # Dépendance optionnelle
+
+    try:
+        batch = msgpack.unpackb(body, raw=False)
+        eans = batch["eans"]
+        readings = np.array(batch["readings"], dtype=float)
+        read_at = batch.get("read_at")
+        if read_at is not None:
+            read_at = np.array(read_at, dtype=np.int64)
+    except (ValueError, TypeError, KeyError, AttributeError) as exc:
+        raise ReadingFormatError(f"Lot MessagePack invalide: {exc}") from exc
+    if not isinstance(eans, list) or not all(
+        isinstance(ean, str) for ean in eans
+    ):
+        raise ReadingFormatError("Les EAN doivent être des chaînes")
+    return to_columns(eans, readings, read_at)
+
+
+def _read_varint(body: bytes, position: int) -> Tuple[int, int]:
+    """Lit un entier varint; retourne (valeur, position suivante)."""
+    value = shift = 0
+    while True:
+        if position >= len(body) or shift > 63:
+            raise ReadingFormatError("Varint Protobuf tronqué")
+        byte = body[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def decode_protobuf(body: bytes) -> ReadingColumns:
+    """Décode un message ReadingBatch (app/proto/readings.proto).
+
+    Les valeurs et les dates « packed » sont lues d'un bloc avec
+    np.frombuffer; seuls les EAN sont décodés un à un.
+    """
+    eans = []
+    readings_chunks = []
+    read_at_chunks = []
+    position = 0
+    while position < len(body):
+        key, position = _read_varint(body, position)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == WIRE_LENGTH_DELIMITED:
+            length, position = _read_varint(body, position)
+            end = position + length
+            if end > len(body):
+                raise ReadingFormatError("Champ Protobuf tronqué")
+            chunk = body[position:end]
+            position = end
+        elif wire_type == WIRE_FIXED64:
+            chunk = body[position : position + 8]
+            position += 8
+            if len(chunk) != 8:
+                raise ReadingFormatError("Champ Protobuf tronqué")
+        elif wire_type == WIRE_VARINT:
+            _, position = _read_varint(body, position)
+            continue  # Champ inconnu : ignoré
+        else:
+            raise ReadingFormatError(f"Type de fil Protobuf {wire_type}")
+
+        if field == 1 and wire_type == WIRE_LENGTH_DELIMITED:
+            try:
+                eans.append(chunk.decode("utf-8"))
+            except UnicodeDecodeError as exc:
+                raise ReadingFormatError("EAN non UTF-8") from exc
+        elif field in (2, 3):
+            if len(chunk) % 8:
+                raise ReadingFormatError("Champ Protobuf packed invalide")
+            target = readings_chunks if field == 2 else read_at_chunks
+            target.append(chunk)
+        # Autres champs : ignorés (compatibilité ascendante)
+
+    readings = np.frombuffer(b"".join(readings_chunks), dtype="<f8")
+    read_at = np.frombuffer(b"".join(read_at_chunks), dtype="<i8")
+    return to_columns(eans, readings, read_at)
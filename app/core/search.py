@@ -0,0 +1,306 @@
+# Recherche de compteurs (préfixe d'EAN) et d'emplacements (nom approché)
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, select
+
+from app.config import get_settings
+from app.core.sharding import is_sharded, sharding_enabled
+from app.models import ChangeLog, Location, LocationRead, Meter
+
+settings = get_settings()
+
+# Index des noms d'emplacements selon la base de données
+POSTGRES_TRIGRAM_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    (
+        "CREATE INDEX IF NOT EXISTS ix_location_name_trgm"
+        " ON location USING gin (name gin_trgm_ops)"
+    ),
+]
+SQLITE_FTS_INDEX = [
+    # Préfixes courts, insensibles à la casse (voir _search_fts)
+    (
+        "CREATE INDEX IF NOT EXISTS ix_location_name_nocase"
+        " ON location (name COLLATE NOCASE)"
+    ),
+    (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS location_fts USING fts5("
+        "name, content='location', content_rowid='id', tokenize='trigram')"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS location_fts_insert AFTER INSERT ON"
+        " location BEGIN INSERT INTO location_fts(rowid, name) VALUES (new.id,"
+        " new.name); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS location_fts_delete AFTER DELETE ON"
+        " location BEGIN INSERT INTO location_fts(location_fts, rowid, name)"
+        " VALUES ('delete', old.id, old.name); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS location_fts_update"
+        " AFTER UPDATE OF name ON location"
+        " BEGIN INSERT INTO location_fts(location_fts, rowid, name)"
+        " VALUES ('delete', old.id, old.name);"
+        " INSERT INTO location_fts(rowid, name) VALUES (new.id, new.name); END"
+    ),
+    "INSERT INTO location_fts(location_fts) VALUES ('rebuild')",
+]
+
+# Le tokenizer trigram de FTS5 ne trouve rien sous 3 caractères
+FTS_MINIMUM_LENGTH = 3
+
+LOCATION_COLUMNS = (
+    Location.id,
+    Location.name,
+    Location.lat,
+    Location.lon,
+    Location.user_id,
+)
+
+
+def create_search_indexes(engine) -> None:
+    """Crée l'index trigram (PostgreSQL) ou FTS5 (SQLite) des noms.
+
+    Sans extension ou module disponible, la recherche utilise l'index en
+    mémoire : l'échec n'empêche pas le démarrage.
+    """
+    statements = {
+        "postgresql": POSTGRES_TRIGRAM_INDEX,
+        "sqlite": SQLITE_FTS_INDEX,
+    }.get(engine.dialect.name)
+    if not statements or settings.SEARCH_BACKEND == "memory":
+        return
+    try:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+    except DBAPIError as exc:
+        print(f"Index de recherche indisponible ({exc.orig}): index mémoire")
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Plus petite chaîne supérieure à toutes celles qui ont ce préfixe."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search_meters(
+    session: Session, query: str, limit: int, user_id: Optional[int] = None
+) -> List[Meter]:
+    """Compteurs dont l'EAN commence par query, triés par EAN.
+
+    Parcours d'intervalle sur la clé primaire : l'EAN exact arrive en
+    premier et le coût dépend du nombre de résultats, pas du parc.
+    """
+    statement = select(Meter).where(
+        (Meter.ean >= query) & (Meter.ean < prefix_upper_bound(query))
+    )
+    if user_id is not None:
+        statement = statement.join(Location).where(Location.user_id == user_id)
+    statement = statement.order_by(Meter.ean).limit(limit)
+    meters = session.exec(statement).all()
+    if is_sharded(session):
+        # Résultats concaténés des shards : tri et limite réappliqués
+        meters = sorted(meters, key=lambda meter: meter.ean)[:limit]
+    return meters
+
+
+def _location_reads(rows) -> List[LocationRead]:
+    return [
+        LocationRead(id=id, name=name, lat=lat, lon=lon, user_id=user_id)
+        for id, name, lat, lon, user_id in rows
+    ]
+
+
+def _search_trigram(session, query, limit, user_id) -> List[LocationRead]:
+    """Recherche PostgreSQL : similarité trigram ou sous-chaîne."""
+    statement = select(*LOCATION_COLUMNS).where(
+        Location.name.op("%")(query)
+        | Location.name.icontains(query, autoescape=True)
+    )
+    if user_id is not None:
+        statement = statement.where(Location.user_id == user_id)
+    statement = statement.order_by(
+        func.similarity(Location.name, query).desc(), Location.name
+    ).limit(limit)
+    return _location_reads(session.exec(statement).all())
+
+
+def _search_fts(session, query, limit, user_id) -> List[LocationRead]:
+    """Recherche SQLite : FTS5 trigram classé par bm25."""
+    if len(query) < FTS_MINIMUM_LENGTH:
+        # Requête courte : préfixe du nom via l'index NOCASE. NOCASE ne
+        # replie que l'ASCII : les bornes sont en minuscules ASCII
+        prefix = "".join(c.lower() if c.isascii() else c for c in query)
+        name = Location.name.collate("NOCASE")
+        statement = select(*LOCATION_COLUMNS).where(
+            (name >= prefix) & (name < prefix_upper_bound(prefix))
+        )
+        if user_id is not None:
+            statement = statement.where(Location.user_id == user_id)
+        statement = statement.order_by(name, Location.name).limit(limit)
+        return _location_reads(session.exec(statement).all())
+
+    owner_filter = "AND location.user_id = :user_id" if user_id else ""
+    statement = text(
+        "SELECT location.id, location.name, location.lat, location.lon,"
+        " location.user_id FROM location_fts"
+        " JOIN location ON location.id = location_fts.rowid"
+        f" WHERE location_fts MATCH :query {owner_filter}"
+        " ORDER BY location_fts.rank, location.name LIMIT :limit"
+    )
+    # Phrase entre guillemets : la saisie n'est pas interprétée par FTS5
+    phrase = '"' + query.replace('"', '""') + '"'
+    rows = session.execute(
+        statement, {"query": phrase, "user_id": user_id, "limit": limit}
+    )
+    return _location_reads(rows.all())
+
+
+def _tokens(name: str) -> List[str]:
+    return re.findall(r"\w+", name.lower())
+
+
+class LocationNameIndex:
+    """Index en mémoire des mots des noms d'emplacements (liste triée).
+
+    Chargé au premier usage puis tenu à jour à partir du journal des
+    modifications : seules les entrées postérieures au curseur sont lues.
+    """
+
+    def __init__(self):
+        self.cursor: Optional[int] = None
+        self.entries: List[Tuple[str, int]] = []  # (mot, id), trié
+        self.locations: Dict[int, tuple] = {}  # id -> ligne LocationRead
+
+    def refresh(self, session: Session) -> None:
+        """Charge l'index, ou applique les modifications depuis le curseur."""
+        latest = session.exec(select(func.max(ChangeLog.id))).one() or 0
+        if self.cursor is None:
+            self.entries = []
+            self.locations = {}
+            rows = session.exec(select(*LOCATION_COLUMNS)).all()
+            for row in rows:
+                self._add(tuple(row))
+            self.entries.sort()
+            self.cursor = latest
+            return
+        if latest <= self.cursor:
+            return
+
+        statement = select(ChangeLog.entity_id).where(
+            (ChangeLog.id > self.cursor)
+            & (ChangeLog.id <= latest)
+            & (ChangeLog.entity == "location")
+        )
+        changed = {int(entity_id) for entity_id in session.exec(statement)}
+        for location_id in changed:
+            self._remove(location_id)
+        if changed:
+            statement = select(*LOCATION_COLUMNS).where(
+                Location.id.in_(changed)
+            )
+            for row in session.exec(statement).all():
+                self._add(tuple(row), keep_sorted=True)
+        self.cursor = latest
+
+    def _add(self, row: tuple, keep_sorted: bool = False) -> None:
+        location_id, name = row[0], row[1]
+        self.locations[location_id] = row
+        for token in set(_tokens(name)):
+            if keep_sorted:
+                bisect.insort(self.entries, (token, location_id))
+            else:
+                self.entries.append((token, location_id))
+
+    def _remove(self, location_id: int) -> None:
+        row = self.locations.pop(location_id, None)
+        if row is None:
+            return
+        for token in set(_tokens(row[1])):
+            position = bisect.bisect_left(self.entries, (token, location_id))
+            if position < len(self.entries) and self.entries[position] == (
+                token,
+                location_id,
+            ):
+                del self.entries[position]
+
+    def search(
+        self, query: str, limit: int, user_id: Optional[int] = None
+    ) -> List[LocationRead]:
+        """Emplacements dont un mot commence par un mot de la requête.
+
+        Classement : nombre de mots trouvés, nom identique, puis nom.
+        """
+        scores: Dict[int, int] = {}
+        for token in set(_tokens(query)):
+            start = bisect.bisect_left(self.entries, (token, -1))
+            end = bisect.bisect_left(
+                self.entries, (prefix_upper_bound(token), -1)
+            )
+            for _, location_id in self.entries[start:end]:
+                scores[location_id] = scores.get(location_id, 0) + 1
+
+        needle = query.lower()
+        ranked = sorted(
+            (
+                (
+                    -score - (self.locations[id][1].lower() == needle),
+                    self.locations[id][1],
+                    id,
+                )
+                for id, score in scores.items()
+                if user_id is None or self.locations[id][4] == user_id
+            )
+        )
+        return _location_reads(
+            self.locations[id] for _, _, id in ranked[:limit]
+        )
+
+
+location_name_index = LocationNameIndex()
+
+# Moteur de recherche des noms détecté au premier usage
+_location_backend: Optional[str] = None
+
+
+def location_search_backend(session: Session) -> str:
+    """Détecte l'index disponible : "trigram", "fts" ou "memory"."""
+    global _location_backend
+    if _location_backend is None:
+        dialect = session.get_bind().dialect.name
+        _location_backend = "memory"
+        if settings.SEARCH_BACKEND == "memory" or sharding_enabled():
+            # Index des shards non interrogeables en une requête globale
+            pass
+        elif dialect == "postgresql":
+            statement = text(
+                "SELECT 1 FROM pg_indexes"
+                " WHERE indexname = 'ix_location_name_trgm'"
+            )
+            if session.execute(statement).first():
+                _location_backend = "trigram"
+        elif dialect == "sqlite":
+            statement = text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'location_fts'"
+            )
+            if session.execute(statement).first():
+                _location_backend = "fts"
+    return _location_backend
+
+
+def search_locations(
+    session: Session, query: str, limit: int, user_id: Optional[int] = None
+) -> List[LocationRead]:
+    """Emplacements dont le nom correspond à query, classés et limités."""
+    backend = location_search_backend(session)
+    if backend == "trigram":
+        return _search_trigram(session, query, limit, user_id)
+    if backend == "fts":
+        return _search_fts(session, query, limit, user_id)
+    location_name_index.refresh(session)
+    return location_name_index.search(query, limit, user_id)
@@ -0,0 +1,121 @@
+# Session SQLAlchemy répartie (importée seulement si le sharding est activé)
+from typing import Dict, Iterable, List
+
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlmodel import Session
+
+from app.core.sharding import (
+    DATA_SHARDS,
+    GLOBAL_SHARD,
+    SHARDED_TABLES,
+    ShardingError,
+    allocate_location_id,
+    hash_shard,
+    location_ids_in,
+    lookup_location_shards,
+    shard_engines,
+    shard_name,
+    statement_tables,
+)
+from app.database import engine
+from app.models import Location, Meter
+
+
+class ShardSession(Session, ShardedSession):
+    """Session qui route chaque instruction vers la base concernée.
+
+    Emplacements et compteurs sont répartis par ID d'emplacement (annuaire
+    LocationShard, rempli par hachage); les autres tables restent sur la
+    base globale. Une lecture sans critère d'emplacement interroge tous les
+    shards et fusionne les résultats. Les jointures entre tables réparties
+    et globales ne sont pas possibles. Une transaction qui touche plusieurs
+    bases est validée base par base, sans commit atomique commun.
+    """
+
+    sharded = True  # Voir is_sharded
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            shards={GLOBAL_SHARD: engine, **shard_engines},
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity,
+            execute_chooser=self._choose_for_statement,
+            **kwargs,
+        )
+        # Annuaire lu pendant la session : {location_id: nom du shard}
+        self._location_shards: Dict[int, str] = {}
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, **kw):
+        # Instructions Core ou sans entité (dialecte, INSERT ... SELECT)
+        if shard_id is None and mapper is None and instance is None:
+            shard_id = self._choose_shard(None, None, clause=kw.get("clause"))
+        return super().get_bind(
+            mapper, shard_id=shard_id, instance=instance, **kw
+        )
+
+    def location_shards(self, location_ids: Iterable[int]) -> Dict[int, str]:
+        """Shard de chaque emplacement (hachage si absent de l'annuaire)."""
+        location_ids = {location_id or 0 for location_id in location_ids}
+        missing = location_ids - self._location_shards.keys()
+        if missing:
+            known = lookup_location_shards(missing)
+            for location_id in missing:
+                index = known.get(location_id)
+                if index is None:
+                    index = hash_shard(location_id)
+                self._location_shards[location_id] = shard_name(index)
+        return {
+            location_id: self._location_shards[location_id]
+            for location_id in location_ids
+        }
+
+    def shards_for_statement(self, statement, parameters=None) -> List[str]:
+        """Bases à interroger pour une instruction."""
+        sharded, global_ = statement_tables(statement)
+        if not sharded:
+            return [GLOBAL_SHARD]
+        if global_:
+            raise ShardingError(
+                "Jointure impossible entre tables réparties et globales"
+            )
+        location_ids = location_ids_in(statement, parameters)
+        if location_ids is None:
+            return DATA_SHARDS
+        return sorted(set(self.location_shards(location_ids).values()))
+
+    def _choose_shard(self, mapper, instance, clause=None) -> str:
+        if isinstance(instance, Location):
+            if instance.id is None:
+                instance.id = allocate_location_id()
+            return self.location_shards([instance.id])[instance.id]
+        if isinstance(instance, Meter):
+            location_id = instance.location_id or 0
+            return self.location_shards([location_id])[location_id]
+        if instance is not None or clause is None:
+            return GLOBAL_SHARD
+        if mapper is not None and mapper.local_table not in SHARDED_TABLES:
+            return GLOBAL_SHARD
+        shards = self.shards_for_statement(clause)
+        if len(shards) > 1:
+            raise ShardingError(
+                "Instruction sur plusieurs shards : préciser shard_id"
+            )
+        return shards[0]
+
+    def _choose_identity(
+        self, mapper, primary_key, *, lazy_loaded_from, **kw
+    ) -> List[str]:
+        if mapper.local_table is Location.__table__:
+            return [self.location_shards(primary_key[:1])[primary_key[0]]]
+        if mapper.local_table is Meter.__table__:
+            # Clé primaire = EAN : le shard n'est connu que par l'emplacement
+            if (
+                lazy_loaded_from is not None
+                and lazy_loaded_from.identity_token
+            ):
+                return [lazy_loaded_from.identity_token]
+            return DATA_SHARDS
+        return [GLOBAL_SHARD]
+
+    def _choose_for_statement(self, context) -> List[str]:
+        return self.shards_for_statement(context.statement, context.parameters)
@@ -0,0 +1,404 @@
+# Partitionnement horizontal (sharding) des emplacements et compteurs
+import asyncio
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, inspect, select, text, update
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import (
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+)
+from sqlalchemy.sql.util import find_tables
+from sqlmodel import Session, create_engine
+
+from app.config import get_settings
+from app.core.querylog import install_query_log
+from app.database import apply_sqlite_profile, engine, pool_options
+from app.models import Location, LocationShard, Meter
+
+settings = get_settings()
+
+# Base globale : utilisateurs, journaux, statistiques, annuaire des shards
+GLOBAL_SHARD = "global"
+
+# Tables réparties selon l'ID d'emplacement; les autres restent globales
+SHARDED_TABLES = (Location.__table__, Meter.__table__)
+
+# Colonnes portant l'ID d'emplacement, qui déterminent le shard
+LOCATION_KEYS = {("location", "id"), ("meter", "location_id")}
+
+
+class ShardingError(Exception):
+    """Instruction qui ne peut pas être routée vers un seul shard."""
+
+
+def shard_name(index: int) -> str:
+    return f"shard{index}"
+
+
+def create_shard_engine(url: str):
+    """Moteur d'un shard, avec les mêmes réglages que la base globale."""
+    shard_engine = create_engine(url, echo=settings.DEBUG, **pool_options(url))
+    if shard_engine.dialect.name == "sqlite" and (
+        settings.SQLITE_PROFILE_ENABLED
+    ):
+        apply_sqlite_profile(shard_engine)
+    install_query_log(shard_engine)
+    return shard_engine
+
+
+# Moteurs des shards, dans l'ordre de SHARD_URLS (vide : désactivé)
+shard_engines = {
+    shard_name(index): create_shard_engine(url)
+    for index, url in enumerate(
+        url.strip() for url in settings.SHARD_URLS.split(",") if url.strip()
+    )
+}
+DATA_SHARDS = list(shard_engines)
+
+
+def sharding_enabled() -> bool:
+    return bool(shard_engines)
+
+
+def hash_shard(location_id: int, count: Optional[int] = None) -> int:
+    """Shard d'un emplacement par hachage de rendez-vous.
+
+    Chaque shard reçoit un score haché de (ID, shard) et le plus élevé
+    l'emporte : l'ajout d'un shard ne déplace que les emplacements qu'il
+    remporte (environ 1/N), sans table de correspondance à maintenir.
+    """
+    count = len(shard_engines) if count is None else count
+    return max(
+        range(count),
+        key=lambda index: hashlib.blake2b(
+            f"{location_id}:{index}".encode(), digest_size=8
+        ).digest(),
+    )
+
+
+def allocate_location_id() -> int:
+    """Réserve un ID d'emplacement dans l'annuaire global et son shard.
+
+    Les ID sont attribués par la base globale : ils restent uniques quel
+    que soit le shard. La réservation est validée immédiatement, hors de
+    la transaction de la requête.
+    """
+    with engine.begin() as connection:
+        location_id = connection.execute(
+            insert(LocationShard).values(shard=0)
+        ).inserted_primary_key[0]
+        connection.execute(
+            update(LocationShard)
+            .where(LocationShard.location_id == location_id)
+            .values(shard=hash_shard(location_id))
+        )
+    return location_id
+
+
+def lookup_location_shards(location_ids: Iterable[int]) -> Dict[int, int]:
+    """Shard de chaque emplacement connu de l'annuaire."""
+    location_ids = list(location_ids)
+    with engine.connect() as connection:
+        return dict(
+            connection.execute(
+                select(LocationShard.location_id, LocationShard.shard).where(
+                    LocationShard.location_id.in_(location_ids)
+                )
+            ).all()
+        )
+
+
+def location_ids_in(statement, parameters=None) -> Optional[Set[int]]:
+    """IDs d'emplacement imposés par les critères d'une instruction.
+
+    Reconnaît location.id ou meter.location_id comparés par = ou IN à des
+    valeurs liées (ou passées à l'exécution, comme les clés d'un chargement
+    selectin), combinés par AND. None si les critères ne restreignent pas
+    les emplacements (aucun critère, ou un OR).
+    """
+    parameters = parameters if isinstance(parameters, dict) else {}
+    location_ids = None
+    for element in visitors.iterate(statement):
+        if (
+            isinstance(element, BooleanClauseList)
+            and element.operator is operators.or_
+        ):
+            return None
+        if not isinstance(element, BinaryExpression) or not isinstance(
+            element.right, BindParameter
+        ):
+            continue
+        table = getattr(element.left, "table", None)
+        key = (
+            getattr(table, "name", None),
+            getattr(element.left, "name", None),
+        )
+        if key not in LOCATION_KEYS:
+            continue
+        value = parameters.get(
+            element.right.key, element.right.effective_value
+        )
+        if value is None:
+            return None
+        if element.operator is operators.eq:
+            values = {value}
+        elif element.operator is operators.in_op:
+            values = set(value)
+        else:
+            continue
+        location_ids = (
+            values if location_ids is None else location_ids & values
+        )
+    return location_ids
+
+
+def statement_tables(statement) -> Tuple[bool, bool]:
+    """(tables réparties, tables globales) référencées par l'instruction."""
+    tables = find_tables(statement, include_aliases=True, include_crud=True)
+    names = {getattr(table, "name", None) for table in tables}
+    sharded = {table.name for table in SHARDED_TABLES}
+    return bool(names & sharded), bool(names - sharded - {None})
+
+
+def is_sharded(session) -> bool:
+    # Pas d'isinstance : ShardSession n'est importée qu'avec le sharding
+    return getattr(session, "sharded", False)
+
+
+def open_session():
+    """Session de la configuration courante (répartie ou non)."""
+    if sharding_enabled():
+        from app.core.shard_session import ShardSession  # Import différé
+
+        return ShardSession()
+    return Session(engine)
+
+
+def get_shard_session():
+    """Dépendance FastAPI remplaçant get_session sous sharding."""
+    from app.core.shard_session import ShardSession  # Import différé
+
+    with ShardSession() as session:
+        yield session
+
+
+def create_shard_tables() -> None:
+    """Crée les tables réparties sur chaque shard si elles n'existent pas.
+
+    Les clés étrangères vers les tables globales (location.user_id) ne
+    peuvent pas être déclarées sur un shard et sont omises.
+    """
+    for shard_engine in shard_engines.values():
+        with shard_engine.begin() as connection:
+            existing = set(inspect(connection).get_table_names())
+            for table in SHARDED_TABLES:
+                if table.name in existing:
+                    continue
+                foreign_keys = [
+                    constraint
+                    for constraint in table.foreign_key_constraints
+                    if constraint.referred_table in SHARDED_TABLES
+                ]
+                connection.execute(
+                    CreateTable(
+                        table, include_foreign_key_constraints=foreign_keys
+                    )
+                )
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index))
+
+
+def split_by_shard(
+    session, location_ids: Iterable[int], rows: List[Any]
+) -> List[Tuple[Dict[str, str], List[Any]]]:
+    """Répartit des lignes par shard de leur emplacement.
+
+    Retourne des couples (bind_arguments, lignes) pour exécuter un UPDATE
+    groupé par clé primaire sur le seul shard concerné.
+    """
+    if not is_sharded(session):
+        return [({}, rows)]
+    location_ids = [location_id or 0 for location_id in location_ids]
+    shards = session.location_shards(location_ids)
+    groups: Dict[str, List[Any]] = defaultdict(list)
+    for location_id, row in zip(location_ids, rows):
+        groups[shards[location_id]].append(row)
+    return [({"shard_id": shard}, group) for shard, group in groups.items()]
+
+
+def data_connections(session) -> List[Any]:
+    """Connexions de la transaction vers chaque base de compteurs."""
+    if not is_sharded(session):
+        return [session.connection()]
+    return [
+        session.connection(bind_arguments={"shard_id": shard_id})
+        for shard_id in DATA_SHARDS
+    ]
+
+
+def planned_moves(
+    shard_count: Optional[int] = None,
+) -> List[Tuple[int, str, str]]:
+    """Emplacements à déplacer : (ID, shard actuel, shard cible).
+
+    Comprend les emplacements encore dans la base globale (données
+    antérieures au sharding) et ceux dont le shard de l'annuaire n'est plus
+    celui du hachage (shard ajouté, ou shard_count réduit pour vider les
+    derniers shards avant de les retirer).
+    """
+    count = len(shard_engines) if shard_count is None else shard_count
+    locations = Location.__table__
+    with engine.connect() as connection:
+        legacy = connection.execute(select(locations.c.id)).scalars().all()
+        directory = connection.execute(
+            select(LocationShard.location_id, LocationShard.shard)
+        ).all()
+    legacy_ids = set(legacy)
+    moves = [
+        (location_id, GLOBAL_SHARD, shard_name(hash_shard(location_id, count)))
+        for location_id in legacy
+    ]
+    moves.extend(
+        (
+            location_id,
+            shard_name(shard),
+            shard_name(hash_shard(location_id, count)),
+        )
+        for location_id, shard in directory
+        if shard != hash_shard(location_id, count)
+        and location_id not in legacy_ids
+    )
+    return moves
+
+
+def current_shard(location_id: int) -> Optional[str]:
+    """Base qui contient un emplacement (None s'il est inconnu)."""
+    locations = Location.__table__
+    with engine.connect() as connection:
+        legacy = connection.execute(
+            select(locations.c.id).where(locations.c.id == location_id)
+        ).first()
+    if legacy is not None:
+        return GLOBAL_SHARD
+    known = lookup_location_shards([location_id])
+    if location_id in known:
+        return shard_name(known[location_id])
+    return None
+
+
+def move_location(location_id: int, source: str, target: str) -> int:
+    """Déplace un emplacement et ses compteurs; retourne leur nombre.
+
+    La copie est validée sur la cible (en remplaçant une copie laissée par
+    une interruption), puis l'annuaire est mis à jour, puis la source est
+    vidée : l'annuaire désigne toujours une copie complète. Les écritures
+    reçues par la source pendant le déplacement seraient perdues : à
+    exécuter hors trafic d'écriture.
+    """
+    engines = {GLOBAL_SHARD: engine, **shard_engines}
+    locations, meters = Location.__table__, Meter.__table__
+    with engines[source].connect() as connection:
+        location = (
+            connection.execute(
+                select(locations).where(locations.c.id == location_id)
+            )
+            .mappings()
+            .first()
+        )
+        rows = (
+            connection.execute(
+                select(meters).where(meters.c.location_id == location_id)
+            )
+            .mappings()
+            .all()
+        )
+    if location is None:
+        raise ValueError(f"Emplacement {location_id} absent de {source}")
+
+    with engines[target].begin() as connection:
+        connection.execute(
+            delete(meters).where(meters.c.location_id == location_id)
+        )
+        connection.execute(
+            delete(locations).where(locations.c.id == location_id)
+        )
+        connection.execute(insert(locations), [dict(location)])
+        if rows:
+            connection.execute(insert(meters), [dict(row) for row in rows])
+
+    shard = int(target.removeprefix("shard"))
+    with engine.begin() as connection:
+        updated = connection.execute(
+            update(LocationShard)
+            .where(LocationShard.location_id == location_id)
+            .values(shard=shard)
+        ).rowcount
+        if not updated:
+            connection.execute(
+                insert(LocationShard).values(
+                    location_id=location_id, shard=shard
+                )
+            )
+
+    with engines[source].begin() as connection:
+        connection.execute(
+            delete(meters).where(meters.c.location_id == location_id)
+        )
+        connection.execute(
+            delete(locations).where(locations.c.id == location_id)
+        )
+    return len(rows)
+
+
+def sync_location_sequence() -> None:
+    """Aligne la séquence PostgreSQL de l'annuaire après une migration.
+
+    Les ID migrés sont insérés explicitement : la séquence doit reprendre
+    après le plus grand (SQLite le fait seul).
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        highest = connection.execute(
+            select(func.max(LocationShard.location_id))
+        ).scalar()
+        if highest:
+            connection.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence("
+                    "'locationshard', 'location_id'), :value)"
+                ),
+                {"value": highest},
+            )
+
+
+def _read_shard(shard_id: str, statement) -> List[Any]:
+    with Session(shard_engines[shard_id]) as session:
+        return session.exec(statement).all()
+
+
+async def exec_all(session, statement) -> List[Any]:
+    """Exécute une lecture, en parallèle sur les shards concernés.
+
+    Sans sharding, équivaut à session.exec(statement).all(). Les résultats
+    des shards sont concaténés : un tri ou une limite doit être réappliqué
+    par l'appelant. Les entités retournées sont détachées; leurs relations
+    vers la base globale doivent être désactivées (noload).
+    """
+    if not is_sharded(session):
+        return session.exec(statement).all()
+    shard_ids = session.shards_for_statement(statement)
+    if shard_ids == [GLOBAL_SHARD]:
+        return session.exec(statement).all()
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(_read_shard, shard_id, statement)
+            for shard_id in shard_ids
+        )
+    )
+    return [row for rows in results for row in rows]
@@ -0,0 +1,125 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from app.config import get_settings
+from app.core.init_db import init_db
+from app.core.search import create_search_indexes
+from app.core.sharding import create_shard_tables, open_session
+from app.core.stats import reconcile_meter_stats
+from app.database import create_db_and_tables, engine
+
+settings = get_settings()
+
+
+class StartupTimer:
+    """Mesure la durée de chaque phase du démarrage de l'application."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Enregistre la durée (en secondes) d'une phase déjà mesurée."""
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mesure la durée du bloc sous le nom de phase donné."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        """Retourne le détail des phases sous forme d'une ligne lisible."""
+        total = sum(self.phases.values())
+        details = ", ".join(
+            f"{name}={seconds * 1000:.1f}ms"
+            for name, seconds in self.phases.items()
+        )
+        return f"Démarrage en {total * 1000:.1f}ms ({details})"
+
+
+def bootstrap_fingerprint() -> str:
+    """Empreinte des bases configurées et du schéma des modèles.
+
+    Un marqueur copié d'un autre environnement (image Docker construite
+    depuis un poste de développement) ou antérieur à un changement de
+    schéma ne correspond pas : l'amorçage est alors refait.
+    """
+    schema = ";".join(
+        f"{table.name}({','.join(column.name for column in table.columns)})"
+        for table in SQLModel.metadata.sorted_tables
+    )
+    source = f"{settings.DATABASE_URL}|{settings.SHARD_URLS}|{schema}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def bootstrap_marker_present() -> bool:
+    """Indique si le schéma et l'amorçage peuvent être ignorés."""
+    if settings.SKIP_DB_INIT:
+        return True
+    try:
+        with open(settings.BOOTSTRAP_MARKER) as marker:
+            return marker.readline().strip() == bootstrap_fingerprint()
+    except OSError:
+        return False
+
+
+def write_bootstrap_marker() -> None:
+    """Écrit l'empreinte dans le marqueur pour les démarrages suivants."""
+    try:
+        with open(settings.BOOTSTRAP_MARKER, "w") as marker:
+            marker.write(f"{bootstrap_fingerprint()}\n")
+    except OSError as exc:
+        # Système de fichiers en lecture seule : l'amorçage sera refait
+        print(f"Impossible d'écrire le marqueur d'amorçage: {exc}")
+
+
+def bootstrap(timer: StartupTimer) -> None:
+    """Crée le schéma et l'admin initial, puis écrit le marqueur."""
+    with timer.phase("schema"):
+        create_db_and_tables()
+        create_shard_tables()
+        create_search_indexes(engine)
+    # Initialiser la base de données avec un utilisateur admin
+    with timer.phase("bootstrap"):
+        with open_session() as session:
+            init_db(session)
+            reconcile_meter_stats(session)
+    write_bootstrap_marker()
+
+
+def warm_up() -> None:
+    """Préchauffe les ressources du worker avant qu'il accepte du trafic."""
+    # Ouvrir plusieurs connexions simultanément pour remplir le pool
+    connections = [
+        engine.connect() for _ in range(settings.WARMUP_DB_CONNECTIONS)
+    ]
+    for connection in connections:
+        connection.execute(text("SELECT 1"))
+        connection.close()
+
+    # Charger jose et valider la clé JWT par un aller-retour
+    from jose import jwt
+
+    token = jwt.encode(
+        {"sub": "warmup"},
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+    # Charger passlib et le backend bcrypt sans calculer de hash
+    from app.auth.password import get_pwd_context
+
+    get_pwd_context().handler("bcrypt").get_backend()
+
+    # Charger NumPy et les modules des lots, différés à l'import
+    import app.core.reading_formats  # noqa: F401
+    import app.core.validation  # noqa: F401
@@ -0,0 +1,254 @@
+# Statistiques du parc maintenues de façon incrémentale
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, text, update
+from sqlmodel import Session, select
+
+from app.core.sharding import is_sharded
+from app.models import (
+    Location,
+    Meter,
+    MeterStat,
+    MeterStatGroup,
+    MeterStatsRead,
+    MeterStatus,
+    MeterType,
+)
+
+stats_table = MeterStat.__table__
+
+# Clé d'agrégation : (emplacement, type, statut)
+StatKey = Tuple[int, MeterType, MeterStatus]
+
+
+def stat_key(location_id, meter_type, status) -> StatKey:
+    """Clé d'agrégation d'un compteur (emplacement 0 s'il n'en a pas)."""
+    return (location_id or 0, MeterType(meter_type), MeterStatus(status))
+
+
+def _dialect_insert(session: Session):
+    """INSERT avec ON CONFLICT du dialecte, ou None s'il n'en a pas."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(stats_table)
+
+
+def apply_stat_deltas(
+    session: Session, deltas: Dict[StatKey, Tuple[int, float]]
+) -> None:
+    """Ajoute des écarts (nombre, total des relevés) aux statistiques.
+
+    Un seul UPSERT groupé, sans commit : les statistiques sont validées
+    avec l'écriture qui les a modifiées.
+    """
+    rows = [
+        {
+            "location_id": location_id,
+            "type": meter_type,
+            "status": status,
+            "count": count,
+            "reading_total": reading_total,
+        }
+        for (location_id, meter_type, status), (
+            count,
+            reading_total,
+        ) in deltas.items()
+        if count or reading_total
+    ]
+    if not rows:
+        return
+
+    upsert = _dialect_insert(session)
+    if upsert is not None:
+        statement = upsert.on_conflict_do_update(
+            index_elements=["location_id", "type", "status"],
+            set_={
+                "count": stats_table.c.count + upsert.excluded.count,
+                "reading_total": (
+                    stats_table.c.reading_total + upsert.excluded.reading_total
+                ),
+            },
+        )
+        session.execute(statement, rows)
+        return
+
+    # Autres bases : UPDATE, puis INSERT des groupes encore absents
+    for row in rows:
+        statement = (
+            update(stats_table)
+            .where(
+                (stats_table.c.location_id == row["location_id"])
+                & (stats_table.c.type == row["type"])
+                & (stats_table.c.status == row["status"])
+            )
+            .values(
+                count=stats_table.c.count + row["count"],
+                reading_total=(
+                    stats_table.c.reading_total + row["reading_total"]
+                ),
+            )
+        )
+        if session.execute(statement).rowcount == 0:
+            session.execute(insert(stats_table), row)
+
+
+def add_meter_stats(session: Session, meter: Meter, sign: int = 1) -> None:
+    """Compte un compteur dans les statistiques (sign=-1 pour le retirer)."""
+    key = stat_key(meter.location_id, meter.type, meter.status)
+    apply_stat_deltas(session, {key: (sign, sign * meter.reading)})
+
+
+def move_meter_stats(
+    session: Session,
+    previous_key: StatKey,
+    previous_reading: float,
+    meter: Meter,
+) -> None:
+    """Reporte un compteur modifié de son ancien groupe vers le nouveau."""
+    deltas = defaultdict(lambda: (0, 0.0))
+    deltas[previous_key] = (-1, -previous_reading)
+    key = stat_key(meter.location_id, meter.type, meter.status)
+    count, reading_total = deltas[key]
+    deltas[key] = (count + 1, reading_total + meter.reading)
+    apply_stat_deltas(session, deltas)
+
+
+def close_location_stats(session: Session, location_id: int) -> None:
+    """Reporte les compteurs ouverts d'un emplacement sur le statut fermé.
+
+    Le calcul part des statistiques elles-mêmes : son coût ne dépend pas
+    du nombre de compteurs de l'emplacement.
+    """
+    statement = select(
+        stats_table.c.type, stats_table.c.count, stats_table.c.reading_total
+    ).where(
+        (stats_table.c.location_id == location_id)
+        & (stats_table.c.status == MeterStatus.OPEN)
+    )
+    deltas = {}
+    for meter_type, count, reading_total in session.execute(statement):
+        deltas[(location_id, meter_type, MeterStatus.OPEN)] = (
+            -count,
+            -reading_total,
+        )
+        deltas[(location_id, meter_type, MeterStatus.CLOSE)] = (
+            count,
+            reading_total,
+        )
+    apply_stat_deltas(session, deltas)
+
+
+def delete_location_stats(session: Session, location_id: int) -> None:
+    """Retire des statistiques les compteurs d'un emplacement supprimé."""
+    session.execute(
+        delete(stats_table).where(stats_table.c.location_id == location_id)
+    )
+
+
+def summarize_stats(session: Session, *criteria) -> MeterStatsRead:
+    """Agrège les statistiques par type et statut selon les critères."""
+    statement = select(
+        MeterStat.type,
+        MeterStat.status,
+        func.sum(MeterStat.count),
+        func.sum(MeterStat.reading_total),
+    )
+    for criterion in criteria:
+        statement = statement.where(criterion)
+    statement = statement.group_by(MeterStat.type, MeterStat.status)
+
+    groups = [
+        MeterStatGroup(
+            type=meter_type,
+            status=status,
+            count=count,
+            reading_total=reading_total,
+        )
+        for meter_type, status, count, reading_total in session.exec(statement)
+        if count
+    ]
+    return MeterStatsRead(
+        total=sum(group.count for group in groups), groups=groups
+    )
+
+
+def user_stats(session: Session, user_id: int) -> MeterStatsRead:
+    """Statistiques des compteurs des emplacements d'un utilisateur."""
+    user_locations = select(Location.id).where(Location.user_id == user_id)
+    if is_sharded(session):
+        # Emplacements sur les shards, statistiques sur la base globale
+        user_locations = session.exec(user_locations).all()
+    return summarize_stats(session, MeterStat.location_id.in_(user_locations))
+
+
+def reconcile_meter_stats(
+    session: Session, check_cancelled: Optional[Callable[[], None]] = None
+) -> Dict[str, int]:
+    """Recalcule les statistiques depuis la table des compteurs et commit.
+
+    Retourne le nombre de groupes et le nombre de groupes qui avaient
+    dérivé (écritures hors API, arrondis flottants, etc.). check_cancelled
+    est appelée après l'agrégation, avant de réécrire la table.
+
+    Sur PostgreSQL, la table des statistiques est verrouillée avant la
+    lecture des compteurs : une écriture concurrente attend la fin du
+    recalcul au lieu d'appliquer un écart aussitôt effacé par le DELETE.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(
+            text(f"LOCK TABLE {stats_table.name} IN SHARE ROW EXCLUSIVE MODE")
+        )
+    location_id = func.coalesce(Meter.location_id, 0)
+    fresh_statement = select(
+        location_id,
+        Meter.type,
+        Meter.status,
+        func.count(),
+        func.coalesce(func.sum(Meter.reading), 0.0),
+    ).group_by(location_id, Meter.type, Meter.status)
+    fresh = {
+        (row[0], row[1], row[2]): (row[3], row[4])
+        for row in session.execute(fresh_statement)
+    }
+    current = {
+        (row.location_id, row.type, row.status): (
+            row.count,
+            row.reading_total,
+        )
+        for row in session.execute(select(stats_table))
+        if row.count
+    }
+
+    if check_cancelled is not None:
+        check_cancelled()
+
+    drifted = 0
+    for key in fresh.keys() | current.keys():
+        count, reading_total = fresh.get(key, (0, 0.0))
+        stored_count, stored_total = current.get(key, (0, 0.0))
+        if count != stored_count or abs(reading_total - stored_total) > 1e-6:
+            drifted += 1
+
+    session.execute(delete(stats_table))
+    if fresh:
+        session.execute(
+            insert(stats_table),
+            [
+                {
+                    "location_id": key[0],
+                    "type": key[1],
+                    "status": key[2],
+                    "count": count,
+                    "reading_total": reading_total,
+                }
+                for key, (count, reading_total) in fresh.items()
+            ],
+        )
+    session.commit()
+    return {"groups": len(fresh), "drifted": drifted}
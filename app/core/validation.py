@@ -0,0 +1,476 @@
+# Validation vectorisée des lots de relevés (NumPy)
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, insert, update
+from sqlmodel import Session, select
+
+from app.config import get_settings
+from app.core.audit import audit_log
+from app.core.changes import record_changes
+from app.core.sharding import data_connections, split_by_shard
+from app.core.stats import apply_stat_deltas
+from app.models import (
+    ChangeOperation,
+    Meter,
+    MeterReading,
+    MeterStatus,
+    MeterType,
+    QuarantinedReading,
+    ReadingBatchResult,
+)
+
+settings = get_settings()
+
+# Instructions Core groupées (executemany) : routées telles quelles par une
+# session répartie, qui ne gère pas les écritures groupées de l'ORM
+METER_READING_UPDATE = update(Meter.__table__).where(
+    Meter.__table__.c.ean == bindparam("meter_ean")
+)
+
+# Ordre des types dans les tableaux de limites (index = code du type)
+METER_TYPES = [MeterType.GAS, MeterType.WATER, MeterType.ELECTRICITY]
+
+# Consommation horaire maximale plausible (m³/h ou kWh/h) par type
+MAX_HOURLY_CONSUMPTION = np.array([40.0, 10.0, 100.0])
+
+# Capacité du totalisateur : au-delà, le compteur repasse à zéro
+REGISTER_CAPACITY = np.array([100_000.0, 100_000.0, 1_000_000.0])
+
+# Part de la capacité considérée comme « proche » du passage à zéro
+ROLLOVER_MARGIN = 0.1
+
+# Nombre minimal de relevés d'un type pour calculer des valeurs aberrantes
+OUTLIER_MIN_SAMPLES = 20
+
+# Nombre d'EAN par requête IN (limite de paramètres de SQLite)
+LOOKUP_CHUNK_SIZE = 10_000
+
+
+@dataclass
+class BatchValidation:
+    """Résultat de la validation d'un lot, trié par compteur puis par date."""
+
+    eans: np.ndarray
+    readings: np.ndarray
+    read_at: np.ndarray
+    previous: np.ndarray
+    reasons: np.ndarray
+    stored: np.ndarray  # Relevé en base avant le lot
+    location_ids: np.ndarray
+    type_codes: np.ndarray
+
+    @property
+    def accepted(self) -> np.ndarray:
+        """Masque des relevés acceptés."""
+        return self.reasons == ""
+
+    def reason_counts(self) -> Dict[str, int]:
+        """Nombre de relevés mis en quarantaine par motif."""
+        reasons, counts = np.unique(
+            self.reasons[~self.accepted], return_counts=True
+        )
+        return dict(zip(reasons.tolist(), counts.tolist()))
+
+    def latest_accepted(self) -> np.ndarray:
+        """Indices du dernier relevé accepté de chaque compteur."""
+        indices = np.flatnonzero(self.accepted)
+        eans = self.eans[indices]
+        last = np.ones(len(indices), dtype=bool)
+        last[:-1] = eans[:-1] != eans[1:]
+        return indices[last]
+
+
+def load_previous_readings(session: Session, eans: np.ndarray):
+    """Charge l'état courant des compteurs d'un lot, aligné sur eans (trié).
+
+    Retourne (connu, relevé, date, code du type, ouvert, emplacement) sous
+    forme de tableaux, en une requête par tranche de LOOKUP_CHUNK_SIZE EAN.
+    """
+    count = len(eans)
+    known = np.zeros(count, dtype=bool)
+    previous = np.zeros(count)
+    last_update = np.zeros(count, dtype="datetime64[us]")
+    type_code = np.zeros(count, dtype=np.int8)
+    is_open = np.zeros(count, dtype=bool)
+    location_ids = np.zeros(count, dtype=np.int64)
+
+    # Requête Core sur la table : évite le coût du chargement ORM par ligne
+    table = Meter.__table__
+    columns = (
+        table.c.ean,
+        table.c.reading,
+        table.c.last_update,
+        table.c.type,
+        table.c.status,
+        table.c.location_id,
+    )
+    for start in range(0, count, LOOKUP_CHUNK_SIZE):
+        chunk = eans[start : start + LOOKUP_CHUNK_SIZE].tolist()
+        statement = select(*columns).where(table.c.ean.in_(chunk))
+        rows = [
+            row
+            for connection in data_connections(session)
+            for row in connection.execute(statement)
+        ]
+        if not rows:
+            continue
+        row_eans, readings, updates, types, statuses, locations = zip(*rows)
+        positions = np.searchsorted(eans, np.array(row_eans, dtype=object))
+        known[positions] = True
+        previous[positions] = readings
+        last_update[positions] = np.array(updates, dtype="datetime64[us]")
+        type_code[positions] = [METER_TYPES.index(t) for t in types]
+        is_open[positions] = [s == MeterStatus.OPEN for s in statuses]
+        location_ids[positions] = [location or 0 for location in locations]
+
+    return known, previous, last_update, type_code, is_open, location_ids
+
+
+def _outlier_limits(
+    readings: np.ndarray,
+    read_at: np.ndarray,
+    meter_index: np.ndarray,
+    first_of_meter: np.ndarray,
+    codes: np.ndarray,
+    candidates: np.ndarray,
+    db_previous: np.ndarray,
+    db_last_update: np.ndarray,
+):
+    """Médiane et MAD des débits par type, NaN si trop peu de relevés.
+
+    Estimées en enchaînant tous les relevés du lot : la médiane et la MAD
+    sont robustes aux quelques relevés qui seront refusés.
+    """
+    previous = db_previous[meter_index]
+    previous_at = db_last_update[meter_index]
+    previous[1:] = np.where(first_of_meter[1:], previous[1:], readings[:-1])
+    previous_at[1:] = np.where(
+        first_of_meter[1:], previous_at[1:], read_at[:-1]
+    )
+    delta = readings - previous
+    hours = (read_at - previous_at) / np.timedelta64(1, "h")
+    rate = delta / np.maximum(hours, 1 / 60)
+    spike = rate > MAX_HOURLY_CONSUMPTION[codes]
+    candidates = candidates & (delta > 0) & (hours > 0) & ~spike
+
+    medians = np.full(len(METER_TYPES), np.nan)
+    mads = np.full(len(METER_TYPES), np.nan)
+    for code in range(len(METER_TYPES)):
+        group = candidates & (codes == code)
+        if group.sum() < OUTLIER_MIN_SAMPLES:
+            continue
+        medians[code] = np.median(rate[group])
+        mads[code] = np.median(np.abs(rate[group] - medians[code]))
+    return medians, mads
+
+
+def _reading_reasons(
+    readings: np.ndarray,
+    read_at: np.ndarray,
+    previous: np.ndarray,
+    previous_at: np.ndarray,
+    stored: np.ndarray,
+    codes: np.ndarray,
+    known: np.ndarray,
+    is_open: np.ndarray,
+    medians: np.ndarray,
+    mads: np.ndarray,
+) -> np.ndarray:
+    """Motif de refus de chaque relevé ("" si accepté)."""
+    capacity = REGISTER_CAPACITY[codes]
+    delta = readings - previous
+    hours = (read_at - previous_at) / np.timedelta64(1, "h")
+    rate = delta / np.maximum(hours, 1 / 60)
+
+    rollover = (
+        (delta < 0)
+        & (previous > capacity * (1 - ROLLOVER_MARGIN))
+        & (readings < capacity * ROLLOVER_MARGIN)
+    )
+    spike = rate > MAX_HOURLY_CONSUMPTION[codes]
+
+    # Valeurs aberrantes : écart robuste (médiane / MAD) par type
+    median, mad = medians[codes], mads[codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = 0.6745 * (rate - median) / mad
+    outlier = (
+        known
+        & (delta > 0)
+        & (hours > 0)
+        & (mad > 0)
+        & (score > settings.READING_OUTLIER_SCORE)
+    )
+
+    # Le premier motif applicable l'emporte
+    return np.select(
+        [
+            ~np.isfinite(readings),
+            ~known,
+            ~is_open,
+            hours <= 0,
+            rollover,
+            (readings < stored) | (delta < 0),
+            delta == 0,
+            spike,
+            outlier,
+        ],
+        [
+            "invalid",
+            "unknown_meter",
+            "closed_meter",
+            "stale",
+            "rollover",
+            "regression",
+            "stuck",
+            "spike",
+            "outlier",
+        ],
+        default="",
+    ).astype(object)
+
+
+def validate_batch(
+    session: Session,
+    eans: np.ndarray,
+    readings: np.ndarray,
+    read_at: np.ndarray,
+) -> BatchValidation:
+    """Valide un lot de relevés, vectorisé sur les compteurs.
+
+    Chaque relevé est comparé au dernier relevé accepté du même compteur
+    (dans le lot, sinon la valeur en base) : un relevé refusé ne sert
+    jamais de référence au suivant. Les relevés sont traités par rang
+    dans leur compteur, une passe vectorisée par rang. Un motif vide
+    signifie que le relevé est accepté.
+    """
+    eans = np.asarray(eans, dtype=object)
+    readings = np.asarray(readings, dtype=float)
+    read_at = np.asarray(read_at, dtype="datetime64[us]")
+
+    unique_eans, meter_index = np.unique(eans, return_inverse=True)
+    known, db_previous, db_last_update, type_code, is_open, location_ids = (
+        load_previous_readings(session, unique_eans)
+    )
+
+    # Trier par compteur puis par date pour enchaîner les relevés du lot
+    order = np.lexsort((read_at, meter_index))
+    eans, readings, read_at = eans[order], readings[order], read_at[order]
+    meter_index = meter_index[order]
+    count = len(order)
+
+    first_of_meter = np.ones(count, dtype=bool)
+    first_of_meter[1:] = meter_index[1:] != meter_index[:-1]
+    codes = type_code[meter_index]
+    stored = db_previous[meter_index]
+    row_known = known[meter_index]
+    row_open = is_open[meter_index]
+    medians, mads = _outlier_limits(
+        readings,
+        read_at,
+        meter_index,
+        first_of_meter,
+        codes,
+        row_known & row_open & np.isfinite(readings),
+        db_previous,
+        db_last_update,
+    )
+
+    # Rang de chaque relevé dans son compteur : un rang contient au plus un
+    # relevé par compteur, traités ensemble
+    positions = np.arange(count)
+    starts = np.maximum.accumulate(np.where(first_of_meter, positions, 0))
+    rank = positions - starts
+    by_rank = np.argsort(rank, kind="stable")
+    rank_groups = np.split(by_rank, np.flatnonzero(np.diff(rank[by_rank])) + 1)
+
+    last_reading = db_previous.copy()
+    last_read_at = db_last_update.copy()
+    previous = np.empty(count)
+    reasons = np.empty(count, dtype=object)
+    for rows in rank_groups:
+        meters = meter_index[rows]
+        previous[rows] = last_reading[meters]
+        reasons[rows] = _reading_reasons(
+            readings[rows],
+            read_at[rows],
+            last_reading[meters],
+            last_read_at[meters],
+            stored[rows],
+            codes[rows],
+            row_known[rows],
+            row_open[rows],
+            medians,
+            mads,
+        )
+        accepted = reasons[rows] == ""
+        last_reading[meters[accepted]] = readings[rows[accepted]]
+        last_read_at[meters[accepted]] = read_at[rows[accepted]]
+
+    return BatchValidation(
+        eans=eans,
+        readings=readings,
+        read_at=read_at,
+        previous=np.where(row_known, previous, np.nan),
+        reasons=reasons,
+        stored=stored,
+        location_ids=location_ids[meter_index],
+        type_codes=codes,
+    )
+
+
+def apply_batch(session: Session, validation: BatchValidation) -> None:
+    """Enregistre les relevés acceptés et met les autres en quarantaine.
+
+    Les compteurs reçoivent leur dernier relevé accepté en un UPDATE groupé
+    par clé primaire; les relevés acceptés (historique) et les relevés
+    signalés sont insérés chacun en un seul INSERT. Le commit reste à la
+    charge de l'appelant.
+    """
+    accepted = validation.accepted
+
+    # Dernier relevé accepté de chaque compteur (le lot est trié par date)
+    latest = validation.latest_accepted()
+    updates = [
+        {"meter_ean": ean, "reading": reading, "last_update": read_at}
+        for ean, reading, read_at in zip(
+            validation.eans[latest].tolist(),
+            validation.readings[latest].tolist(),
+            validation.read_at[latest].tolist(),
+        )
+    ]
+    if updates:
+        for bind_arguments, rows in split_by_shard(
+            session, validation.location_ids[latest].tolist(), updates
+        ):
+            session.execute(
+                METER_READING_UPDATE, rows, bind_arguments=bind_arguments
+            )
+        apply_reading_stats(
+            session,
+            validation.location_ids[latest],
+            validation.type_codes[latest],
+            validation.readings[latest] - validation.stored[latest],
+        )
+        record_changes(
+            session,
+            "meter",
+            [row["meter_ean"] for row in updates],
+            ChangeOperation.UPDATE,
+        )
+
+    # Historique : tous les relevés acceptés, pas seulement le dernier
+    history = [
+        {
+            "ean": ean,
+            "type": METER_TYPES[code],
+            "reading": reading,
+            "read_at": read_at,
+        }
+        for ean, code, reading, read_at in zip(
+            validation.eans[accepted].tolist(),
+            validation.type_codes[accepted].tolist(),
+            validation.readings[accepted].tolist(),
+            validation.read_at[accepted].tolist(),
+        )
+    ]
+    if history:
+        session.execute(insert(MeterReading.__table__), history)
+
+    # Une valeur non finie n'a rien à réexaminer (et la colonne est NOT NULL)
+    flagged = ~accepted & np.isfinite(validation.readings)
+    received_at = datetime.utcnow()
+    quarantined = [
+        {
+            "ean": ean,
+            "reading": reading,
+            "previous_reading": None if np.isnan(previous) else previous,
+            "read_at": read_at,
+            "reason": reason,
+            "received_at": received_at,
+        }
+        for ean, reading, previous, read_at, reason in zip(
+            validation.eans[flagged].tolist(),
+            validation.readings[flagged].tolist(),
+            validation.previous[flagged].tolist(),
+            validation.read_at[flagged].tolist(),
+            validation.reasons[flagged].tolist(),
+        )
+    ]
+    if quarantined:
+        session.execute(insert(QuarantinedReading.__table__), quarantined)
+
+
+def apply_reading_stats(
+    session: Session,
+    location_ids: np.ndarray,
+    type_codes: np.ndarray,
+    deltas: np.ndarray,
+) -> None:
+    """Ajoute aux statistiques les écarts de relevés par emplacement et type.
+
+    Les compteurs dont un relevé est accepté sont tous ouverts.
+    """
+    keys = location_ids * len(METER_TYPES) + type_codes
+    unique_keys, group = np.unique(keys, return_inverse=True)
+    totals = np.bincount(group, weights=deltas)
+    apply_stat_deltas(
+        session,
+        {
+            (
+                int(key) // len(METER_TYPES),
+                METER_TYPES[int(key) % len(METER_TYPES)],
+                MeterStatus.OPEN,
+            ): (0, float(total))
+            for key, total in zip(unique_keys, totals)
+        },
+    )
+
+
+def reading_audit_events(
+    validation: BatchValidation, principal_id: Optional[int]
+) -> list:
+    """Événements d'audit des relevés enregistrés (un par compteur)."""
+    occurred_at = datetime.utcnow()
+    latest = validation.latest_accepted()
+    return [
+        {
+            "occurred_at": occurred_at,
+            "principal_id": principal_id,
+            "entity": "meter",
+            "entity_id": ean,
+            "action": ChangeOperation.UPDATE,
+            "changes": {"reading": [stored, reading]},
+        }
+        for ean, stored, reading in zip(
+            validation.eans[latest].tolist(),
+            validation.stored[latest].tolist(),
+            validation.readings[latest].tolist(),
+        )
+    ]
+
+
+def ingest_batch(
+    session: Session,
+    eans: np.ndarray,
+    readings: np.ndarray,
+    read_at: np.ndarray,
+    principal_id: Optional[int] = None,
+) -> ReadingBatchResult:
+    """Valide et enregistre un lot fourni sous forme de colonnes."""
+    if len(eans) == 0:
+        return ReadingBatchResult(accepted=0, quarantined=0, reasons={})
+
+    validation = validate_batch(session, eans, readings, read_at)
+    apply_batch(session, validation)
+    session.commit()
+    audit_log.record_many(reading_audit_events(validation, principal_id))
+
+    accepted = int(validation.accepted.sum())
+    return ReadingBatchResult(
+        accepted=accepted,
+        quarantined=len(validation.eans) - accepted,
+        reasons=validation.reason_counts(),
+    )
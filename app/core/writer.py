@@ -0,0 +1,146 @@
+# File d'écriture sérialisée (SQLite) : un seul écrivain, commits groupés
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.config import get_settings
+from app.core.querylog import install_query_log
+from app.core.sharding import open_session, sharding_enabled
+from app.database import create_writer_engine, engine, is_sqlite
+
+settings = get_settings()
+
+# Opération d'écriture : reçoit la session partagée du lot, sans commit
+WriteOperation = Callable[[Session], Any]
+
+
+class WriteQueue:
+    """Sérialise les écritures dans une tâche unique qui les regroupe.
+
+    Les opérations en attente sont exécutées dans une même transaction
+    (BEGIN IMMEDIATE), chacune dans un SAVEPOINT : une opération qui échoue
+    est annulée sans affecter les autres, puis un seul commit valide le
+    lot. Sous SQLite, les requêtes ne se disputent plus le verrou
+    d'écriture et le coût de synchronisation est partagé.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._engine = None
+
+    @property
+    def enabled(self) -> bool:
+        """La file n'est utilisée qu'avec une base SQLite sur fichier.
+
+        Avec le sharding, chaque écriture a sa propre session répartie.
+        """
+        in_memory = engine.url.database in (None, "", ":memory:")
+        return (
+            settings.WRITE_QUEUE_ENABLED
+            and is_sqlite()
+            and not in_memory
+            and not sharding_enabled()
+        )
+
+    async def start(self) -> None:
+        """Démarre l'écrivain si la file est activée."""
+        if self.enabled:
+            if self._engine is None:
+                self._engine = create_writer_engine()
+                install_query_log(self._engine)
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._drain())
+
+    async def stop(self) -> None:
+        """Exécute les écritures en attente, puis arrête l'écrivain."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """Exécute une opération d'écriture et retourne son résultat.
+
+        Le résultat ne doit pas dépendre de la session (objets détachés ou
+        schémas de réponse). Les exceptions de l'opération sont relevées
+        telles quelles pour l'appelant.
+        """
+        if self._task is None:
+            # File désactivée : transaction dédiée
+            return self._write_batch(open_session, [operation])[0].result()
+        future = asyncio.get_running_loop().create_future()
+        # Exécutée dans le contexte de la requête (capture du profilage)
+        operation = functools.partial(
+            contextvars.copy_context().run, operation
+        )
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _drain(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            batch: List[Tuple[WriteOperation, asyncio.Future]] = []
+            while item is not None:
+                batch.append(item)
+                if (
+                    len(batch) >= settings.WRITE_QUEUE_MAX_BATCH
+                    or self._queue.empty()
+                ):
+                    break
+                item = self._queue.get_nowait()
+            stopping = item is None
+            if not batch:
+                continue
+
+            operations = [operation for operation, _ in batch]
+            outcomes = await asyncio.to_thread(
+                self._write_batch,
+                functools.partial(Session, self._engine),
+                operations,
+            )
+            for (_, future), outcome in zip(batch, outcomes):
+                if future.cancelled():
+                    continue
+                if outcome.exception() is not None:
+                    future.set_exception(outcome.exception())
+                else:
+                    future.set_result(outcome.result())
+
+    @staticmethod
+    def _write_batch(
+        session_factory: Callable[[], Session],
+        operations: List[WriteOperation],
+    ) -> List[Future]:
+        """Exécute un lot en une transaction (un Future par opération)."""
+        outcomes = [Future() for _ in operations]
+        succeeded = []
+        with session_factory() as session:
+            for operation, outcome in zip(operations, outcomes):
+                try:
+                    with session.begin_nested():
+                        result = operation(session)
+                except Exception as exc:
+                    outcome.set_exception(exc)
+                else:
+                    succeeded.append((outcome, result))
+            try:
+                session.commit()
+            except Exception as exc:
+                # Échec du commit : aucune opération n'a été enregistrée
+                for outcome, _ in succeeded:
+                    outcome.set_exception(exc)
+                return outcomes
+        for outcome, result in succeeded:
+            outcome.set_result(result)
+        return outcomes
+
+
+# Instance unique, démarrée et arrêtée par le lifespan de l'application
+write_queue = WriteQueue()
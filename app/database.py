@@ -1,14 +1,95 @@
 # Configuration de la base de données avec SQLModel
 from typing import Generator
 
+from sqlalchemy import event, make_url
 from sqlmodel import Session, SQLModel, create_engine
 
 from app.config import get_settings
+from app.core.querylog import install_query_log
 
 settings = get_settings()
 
+
+def pool_options(url: str = settings.DATABASE_URL) -> dict:
+    """Taille du pool, sauf pour SQLite en mémoire (connexion unique)."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+
+
 # Création du moteur de base de données
-engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+engine = create_engine(
+    settings.DATABASE_URL, echo=settings.DEBUG, **pool_options()
+)
+
+
+def is_sqlite() -> bool:
+    """Indique si la base configurée est SQLite."""
+    return engine.dialect.name == "sqlite"
+
+
+def apply_sqlite_profile(engine) -> None:
+    """Applique le profil de performance SQLite à chaque connexion.
+
+    WAL laisse les lectures se poursuivre pendant une écriture, busy_timeout
+    fait patienter un écrivain au lieu d'échouer avec "database is locked".
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        # Taille négative : en Kio plutôt qu'en pages
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(
+            f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}"
+        )
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+if is_sqlite() and settings.SQLITE_PROFILE_ENABLED:
+    apply_sqlite_profile(engine)
+
+# Requêtes lentes et capture des requêtes profilées
+install_query_log(engine)
+
+
+def create_writer_engine():
+    """Moteur de l'écrivain unique : une connexion, hors du pool partagé.
+
+    Les requêtes qui attendent la file d'écriture gardent leur connexion :
+    l'écrivain ne doit pas dépendre du même pool. Ses transactions
+    commencent par BEGIN IMMEDIATE : le verrou d'écriture est pris d'emblée,
+    sans échec de promotion d'une lecture en écriture sous WAL, et les
+    SAVEPOINT fonctionnent (le pilote sqlite3 n'ouvre pas lui-même la
+    transaction).
+    """
+    writer = create_engine(
+        settings.DATABASE_URL, echo=settings.DEBUG, pool_size=1, max_overflow=0
+    )
+    if settings.SQLITE_PROFILE_ENABLED:
+        apply_sqlite_profile(writer)
+
+    @event.listens_for(writer, "connect")
+    def disable_implicit_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer, "begin")
+    def begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer
 
 
 def create_db_and_tables():
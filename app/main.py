@@ -1,29 +1,79 @@
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from sqlmodel import Session
 
+from app import IMPORT_STARTED
 from app.config import get_settings
-from app.core.init_db import init_db
-from app.database import create_db_and_tables, engine
-from app.routers import auth, location, meter, user
+from app.core.sharding import get_shard_session, sharding_enabled
+from app.core.startup import (
+    StartupTimer,
+    bootstrap,
+    bootstrap_marker_present,
+    warm_up,
+)
+from app.database import get_session
+from app.routers import (
+    admin,
+    auth,
+    changes,
+    job,
+    location,
+    meter,
+    stats,
+    user,
+)
 
 settings = get_settings()
+imports_done = time.perf_counter()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application."""
+    # Imports différés : tâches de fond chargées hors de la phase d'import
+    from app.core.audit import audit_log
+    from app.core.jobs import job_runner
+    from app.core.writer import write_queue
+
     # Code exécuté au démarrage
-    create_db_and_tables()
-    # Initialiser la base de données avec un utilisateur admin
-    with Session(engine) as session:
-        init_db(session)
+    timer = StartupTimer()
+    timer.record("import", imports_done - IMPORT_STARTED)
+    if bootstrap_marker_present():
+        print("Marqueur d'amorçage présent: schéma et init ignorés")
+    else:
+        bootstrap(timer)
+    if settings.WARMUP_ON_STARTUP:
+        with timer.phase("warmup"):
+            warm_up()
+    with timer.phase("jobs"):
+        if settings.CHANGES_COMPACTION_INTERVAL > 0:
+            job_runner.schedule(
+                "changes.compact", settings.CHANGES_COMPACTION_INTERVAL
+            )
+        if settings.STATS_RECONCILE_INTERVAL > 0:
+            job_runner.schedule(
+                "stats.reconcile", settings.STATS_RECONCILE_INTERVAL
+            )
+        if settings.READINGS_ARCHIVE_INTERVAL > 0:
+            job_runner.schedule(
+                "readings.archive", settings.READINGS_ARCHIVE_INTERVAL
+            )
+        await job_runner.start()
+    with timer.phase("writer"):
+        await write_queue.start()
+        await audit_log.start()
+    app.state.startup_timings = timer.phases
+    print(timer.report())
 
     yield  # L'application s'exécute ici
 
     # Code exécuté à l'arrêt
-    # Fermeture des connexions, nettoyage des ressources, etc.
+    # Valider les écritures en attente, puis terminer les tâches de fond
+    await write_queue.stop()
+    await job_runner.stop()
+    # Écrire les derniers événements d'audit une fois les écritures finies
+    await audit_log.stop()
 
 
 app = FastAPI(
@@ -33,11 +83,40 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Middlewares : le dernier ajouté est exécuté en premier, la limitation de
+# débit rejette donc les abus avant qu'ils n'occupent une place de délestage.
+# Le profilage, le plus interne, ne mesure que le traitement de la requête.
+# Chaque middleware n'est importé que s'il est activé.
+if settings.PROFILING_ENABLED:
+    from app.middleware.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+if settings.COMPRESSION_ENABLED:
+    from app.middleware.compression import CompressionMiddleware
+
+    app.add_middleware(CompressionMiddleware)
+if settings.LOAD_SHEDDING_ENABLED:
+    from app.middleware.shedding import LoadSheddingMiddleware
+
+    app.add_middleware(LoadSheddingMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    from app.middleware.ratelimit import RateLimitMiddleware
+
+    app.add_middleware(RateLimitMiddleware)
+
+# Emplacements et compteurs répartis : sessions routées vers les shards
+if sharding_enabled():
+    app.dependency_overrides[get_session] = get_shard_session
+
 # Inclure les routers
 app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(location.router)
 app.include_router(meter.router)
+app.include_router(job.router)
+app.include_router(changes.router)
+app.include_router(stats.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -0,0 +1,259 @@
+# Compression négociée des réponses (zstd, brotli, gzip)
+import importlib.util
+import zlib
+from typing import Dict, Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Contenus déjà compressés ou diffusés en continu : jamais recompressés
+EXCLUDED_CONTENT_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "text/event-stream",
+    "application/gzip",
+    "application/zip",
+)
+
+# Au-delà de cette taille, un bloc est compressé dans un thread
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+
+class GzipEncoder:
+    """Encodeur gzip (bibliothèque standard)."""
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Encodeur brotli (paquet optionnel brotli)."""
+
+    def __init__(self, level: int):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    """Encodeur zstd (paquet optionnel zstandard)."""
+
+    def __init__(self, level: int):
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _installed(module: str) -> bool:
+    """Indique si un module optionnel est installé."""
+    return importlib.util.find_spec(module) is not None
+
+
+# Encodages disponibles, par ordre de préférence à qualité égale :
+# (classe, niveau normal, niveau en saturation)
+ENCODERS = {}
+if _installed("zstandard"):
+    ENCODERS["zstd"] = (ZstdEncoder, settings.COMPRESSION_ZSTD_LEVEL, 1)
+if _installed("brotli"):
+    ENCODERS["br"] = (BrotliEncoder, settings.COMPRESSION_BROTLI_LEVEL, 0)
+ENCODERS["gzip"] = (GzipEncoder, settings.COMPRESSION_GZIP_LEVEL, 1)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Retourne la qualité demandée par encodage dans Accept-Encoding."""
+    qualities = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities
+
+
+def negotiate_encoding(header: str) -> Optional[str]:
+    """Choisit le meilleur encodage accepté par le client, ou None."""
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for name in ENCODERS:
+        quality = qualities.get(name, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compresse les réponses selon Accept-Encoding.
+
+    Les réponses sous le seuil de taille sont envoyées telles quelles. Les
+    réponses en plusieurs morceaux (StreamingResponse) sont compressées au
+    fil de l'eau. Quand le worker compresse déjà trop de morceaux à la
+    fois, le niveau le plus rapide est utilisé pour borner le coût CPU.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.in_flight = 0  # Compressions en cours (pas les requêtes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self.app, encoding, self)
+        await responder(scope, receive, send)
+
+    def create_encoder(self, encoding: str):
+        """Encodeur au niveau adapté à la charge de compression actuelle."""
+        encoder_class, level, saturated_level = ENCODERS[encoding]
+        if self.in_flight >= settings.COMPRESSION_SATURATION:
+            level = saturated_level
+        return encoder_class(level)
+
+
+class CompressionResponder:
+    """Réécrit les messages d'une seule réponse HTTP."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encoding: str,
+        middleware: CompressionMiddleware,
+    ):
+        self.app = app
+        self.encoding = encoding
+        self.middleware = middleware
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.encoder = None
+        self.buffer = b""
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Attendre le corps pour savoir s'il dépasse le seuil
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            self.buffer += message.get("body", b"")
+            if len(self.buffer) < settings.COMPRESSION_MINIMUM_SIZE:
+                if not more_body:
+                    # Réponse trop petite : envoyée sans compression
+                    await self.send(self.start_message)
+                    await self.send(
+                        {"type": "http.response.body", "body": self.buffer}
+                    )
+                return
+            self.start_encoding(more_body)
+            body, self.buffer = self.buffer, b""
+        else:
+            body = message.get("body", b"")
+
+        compressed = await self.encode(body, more_body)
+        if not self.started:
+            if not more_body:
+                # Réponse complète : longueur connue après compression
+                headers = MutableHeaders(raw=self.start_message["headers"])
+                headers["Content-Length"] = str(len(compressed))
+            await self.send(self.start_message)
+            self.started = True
+        await self.send(
+            {
+                "type": "http.response.body",
+                "body": compressed,
+                "more_body": more_body,
+            }
+        )
+
+    def start_encoding(self, more_body: bool) -> None:
+        """Crée l'encodeur et adapte les en-têtes de la réponse."""
+        self.encoder = self.middleware.create_encoder(self.encoding)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body and "content-length" in headers:
+            # Flux : longueur inconnue, envoi en transfert par morceaux
+            del headers["Content-Length"]
+
+    async def encode(self, body: bytes, more_body: bool) -> bytes:
+        """Compresse un morceau; le dernier termine le flux compressé."""
+
+        def run() -> bytes:
+            data = self.encoder.compress(body)
+            if more_body:
+                return data + self.encoder.flush()
+            return data + self.encoder.finish()
+
+        self.middleware.in_flight += 1
+        try:
+            if len(body) >= THREAD_MINIMUM_SIZE:
+                return await anyio.to_thread.run_sync(run)
+            return run()
+        finally:
+            self.middleware.in_flight -= 1
@@ -0,0 +1,188 @@
+# Profilage à la demande d'une requête (administrateurs uniquement)
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures.thread import _WorkItem
+from contextvars import Context, ContextVar
+from typing import Dict, List, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+from app.core.querylog import captured_queries
+from app.middleware.ratelimit import token_principal
+
+settings = get_settings()
+
+# Profileur de la requête en cours, propagé aux threads qu'elle sollicite
+active_sampler: ContextVar[Optional["StackSampler"]] = ContextVar(
+    "active_sampler", default=None
+)
+
+# Nombre de piles distinctes conservées dans le rapport
+PROFILE_TOP_STACKS = 30
+
+# Dernier appel Python d'un thread inactif (attente d'un travail) : ignoré
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+def profiling_requested(request: Request) -> bool:
+    """En-tête X-Profile: 1 ou paramètre ?profile=1."""
+    flag = request.headers.get("x-profile") or request.query_params.get(
+        "profile"
+    )
+    return flag in ("1", "true", "yes")
+
+
+def is_admin(email: str) -> bool:
+    """Relit le rôle en base, comme get_admin_user (pas celui du jeton)."""
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.models import User, UserRole
+
+    with Session(engine) as session:
+        statement = select(User.role).where(User.email == email)
+        return session.exec(statement).first() == UserRole.ADMIN
+
+
+def thread_contexts(frame):
+    """Contextes (contextvars) des tâches exécutées par un thread.
+
+    asyncio.to_thread et la file d'écriture exécutent des
+    partial(Context.run, ...); les workers anyio gardent le contexte dans
+    une variable locale.
+    """
+    while frame is not None:
+        for value in frame.f_locals.values():
+            if isinstance(value, _WorkItem):
+                value = value.fn
+            if isinstance(value, functools.partial):
+                value = getattr(value.func, "__self__", None)
+            if isinstance(value, Context):
+                yield value
+        frame = frame.f_back
+
+
+class StackSampler:
+    """Profileur par échantillonnage des piles d'appels d'une requête.
+
+    Un thread relève sys._current_frames() à intervalle fixe : la requête
+    profilée n'est pas ralentie par un traçage de chaque appel. Seuls la
+    boucle d'événements et les threads qui travaillent pour la requête
+    (même contexte) sont retenus : ni les autres requêtes ni les tâches de
+    fond. Les piles sont agrégées au format « replié » (lisible par les
+    outils flamegraph).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.loop_thread_id = threading.get_ident()
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        sampler_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                code = frame.f_code
+                leaf = (os.path.basename(code.co_filename), code.co_name)
+                if thread_id == sampler_id or leaf in IDLE_FRAMES:
+                    continue
+                if thread_id != self.loop_thread_id and not any(
+                    context.get(active_sampler) is self
+                    for context in thread_contexts(frame)
+                ):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def report(self) -> Dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": [
+                f"{stack} {count}"
+                for stack, count in self.stacks.most_common(PROFILE_TOP_STACKS)
+            ],
+        }
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Remplace la réponse d'une requête profilée par un rapport.
+
+    Le rapport contient le statut d'origine, la durée, les requêtes SQL
+    exécutées (paramètres masqués) avec leur durée, et les piles relevées
+    par le profileur. Réservé aux administrateurs (rôle relu en base).
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if not profiling_requested(request):
+            return await call_next(request)
+        principal = token_principal(request)
+        if principal is None or not await asyncio.to_thread(
+            is_admin, principal[0]
+        ):
+            return await call_next(request)
+
+        queries: List[Dict] = []
+        token = captured_queries.set(queries)
+        sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+        sampler_token = active_sampler.set(sampler)
+        started_at = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+            # Lire le corps : le traitement se termine avec la réponse
+            async for _ in response.body_iterator:
+                pass
+        finally:
+            sampler.stop()
+            active_sampler.reset(sampler_token)
+            captured_queries.reset(token)
+        duration_ms = (time.perf_counter() - started_at) * 1000
+
+        return JSONResponse(
+            {
+                "method": request.method,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "duration_ms": round(duration_ms, 3),
+                "query_count": len(queries),
+                "query_time_ms": round(
+                    sum(query["duration_ms"] for query in queries), 3
+                ),
+                "queries": [
+                    {**query, "occurred_at": query["occurred_at"].isoformat()}
+                    for query in queries
+                ],
+                "profile": sampler.report(),
+            }
+        )
@@ -0,0 +1,165 @@
+# Limitation de débit par seau à jetons (sujet JWT / rôle, ou adresse IP)
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import anyio
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class InMemoryBucketStore:
+    """Seaux à jetons conservés dans la mémoire du worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """Consomme un jeton; retourne 0 ou l'attente (s) avant le suivant."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # Mémoire bornée : oublier les clés les moins récemment vues
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Même algorithme exécuté atomiquement côté serveur (Redis ou compatible)
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class SharedBucketStore:
+    """Seaux à jetons partagés entre workers via un client de type Redis.
+
+    Le client doit seulement fournir eval(script, numkeys, *args) : un
+    client redis-py, fakeredis ou tout faux local équivalent convient. Un
+    client asynchrone (redis.asyncio) est attendu sur la boucle; l'appel
+    d'un client synchrone est exécuté dans un thread, pour ne pas bloquer
+    la boucle pendant l'aller-retour réseau.
+    """
+
+    def __init__(
+        self, client, prefix: str = "ratelimit:", asynchronous: bool = False
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.asynchronous = asynchronous
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """Consomme un jeton; retourne 0 ou l'attente (s) avant le suivant."""
+        args = (TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, rate, capacity)
+        if self.asynchronous:
+            wait = await self.client.eval(*args)
+        else:
+            wait = await anyio.to_thread.run_sync(
+                functools.partial(self.client.eval, *args)
+            )
+        return float(wait)
+
+
+def create_bucket_store():
+    """Crée le stockage configuré (mémoire par défaut)."""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        import redis.asyncio  # Dépendance optionnelle
+
+        client = redis.asyncio.Redis.from_url(settings.RATE_LIMIT_REDIS_URL)
+        return SharedBucketStore(client, asynchronous=True)
+    return InMemoryBucketStore()
+
+
+# Requêtes par minute (et taille de rafale) selon le rôle du jeton
+ROLE_LIMITS = {
+    "consumer": lambda: settings.RATE_LIMIT_CONSUMER,
+    "employee": lambda: settings.RATE_LIMIT_EMPLOYEE,
+    "admin": lambda: settings.RATE_LIMIT_ADMIN,
+}
+
+
+def token_principal(request: Request) -> Optional[Tuple[str, str]]:
+    """Retourne (sujet, rôle) d'un jeton Bearer valide, sinon None."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    from jose import JWTError, jwt  # Import différé au premier usage
+
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    if subject is None:
+        return None
+    return subject, payload.get("role", "consumer")
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Refuse avec 429 les requêtes qui dépassent la limite du principal."""
+
+    def __init__(self, app, store=None):
+        super().__init__(app)
+        self.store = store or create_bucket_store()
+
+    def limit_for(self, request: Request) -> Tuple[str, int]:
+        """Détermine la clé du seau et la limite par minute à appliquer."""
+        client_ip = request.client.host if request.client else "inconnu"
+        # Authentification : limite stricte par IP contre la force brute
+        if request.url.path == "/token":
+            return f"token:{client_ip}", settings.RATE_LIMIT_LOGIN
+
+        principal = token_principal(request)
+        if principal is None:
+            return f"ip:{client_ip}", settings.RATE_LIMIT_ANONYMOUS
+        subject, role = principal
+        limit = ROLE_LIMITS.get(role, ROLE_LIMITS["consumer"])()
+        return f"sub:{subject}", limit
+
+    async def dispatch(self, request: Request, call_next):
+        key, per_minute = self.limit_for(request)
+        wait = await self.store.take(key, per_minute / 60, per_minute)
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Trop de requêtes, réessayez plus tard"},
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        return await call_next(request)
@@ -0,0 +1,126 @@
+# Délestage adaptatif : limite de concurrence ajustée selon l'attente
+import asyncio
+import math
+import time
+from collections import deque
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Priorités : les requêtes de priorité basse sont délestées en premier
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+PRIORITY_HIGH = 4
+
+# Listes complètes : coûteuses et pouvant être rejouées plus tard
+LOW_PRIORITY_PATHS = {"/meter/", "/location/", "/user/"}
+
+
+def route_priority(method: str, path: str) -> int:
+    """Détermine la priorité de délestage d'une requête."""
+    # Authentification et relevés du head-end : préservés le plus longtemps
+    if path == "/token" or (method == "PATCH" and path.startswith("/meter/")):
+        return PRIORITY_HIGH
+    if method == "GET" and path in LOW_PRIORITY_PATHS:
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limite de concurrence ajustée (AIMD) selon la latence d'attente.
+
+    La limite augmente d'un cran par fenêtre tant que l'attente reste sous
+    la cible, et diminue de 10 % dès qu'elle la dépasse.
+    """
+
+    def __init__(
+        self,
+        target_delay: float,
+        min_limit: int,
+        max_limit: int,
+    ):
+        self.target_delay = target_delay
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        """Attend une place au plus timeout secondes; False si délestée."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():  # Place attribuée au moment de l'expiration
+                return True
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            return False
+        except asyncio.CancelledError:
+            # Client parti ou tâche annulée : rendre la place si attribuée
+            if waiter.done():
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, queue_delay: float) -> None:
+        """Libère une place et ajuste la limite selon l'attente observée."""
+        self.in_flight -= 1
+        if queue_delay > self.target_delay:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        """Attribue les places libres aux requêtes en attente (FIFO)."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class LoadSheddingMiddleware(BaseHTTPMiddleware):
+    """Répond 503 + Retry-After quand l'attente dépasse la cible."""
+
+    def __init__(self, app, limiter: AdaptiveConcurrencyLimiter = None):
+        super().__init__(app)
+        self.limiter = limiter or AdaptiveConcurrencyLimiter(
+            target_delay=settings.LOAD_SHEDDING_TARGET_MS / 1000,
+            min_limit=settings.LOAD_SHEDDING_MIN_CONCURRENCY,
+            max_limit=settings.LOAD_SHEDDING_MAX_CONCURRENCY,
+        )
+
+    async def dispatch(self, request: Request, call_next):
+        priority = route_priority(request.method, request.url.path)
+        # Attente maximale proportionnelle à la priorité de la route
+        max_wait = self.limiter.target_delay * priority
+        started = time.monotonic()
+        if not await self.limiter.acquire(max_wait):
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Service surchargé, réessayez plus tard"},
+                headers={"Retry-After": str(max(1, math.ceil(max_wait)))},
+            )
+
+        queue_delay = time.monotonic() - started
+        try:
+            return await call_next(request)
+        finally:
+            self.limiter.release(queue_delay)
@@ -1,7 +1,9 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -23,6 +25,20 @@ class UserRole(str, Enum):
     ADMIN = "admin"
 
 
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ChangeOperation(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
 # Modèles principaux
 class User(SQLModel, table=True):
     """Modèle d'utilisateur."""
@@ -84,6 +100,93 @@ class Meter(SQLModel, table=True):
         return ""
 
 
+class MeterStat(SQLModel, table=True):
+    """Agrégats des compteurs (nombre, total des relevés) par groupe."""
+
+    location_id: int = Field(primary_key=True)  # 0 = sans emplacement
+    type: MeterType = Field(primary_key=True)
+    status: MeterStatus = Field(primary_key=True)
+    count: int = Field(default=0)
+    reading_total: float = Field(default=0.0)
+
+
+class MeterReading(SQLModel, table=True):
+    """Historique récent des relevés (les anciens sont archivés)."""
+
+    __table_args__ = (Index("ix_meterreading_ean_read_at", "ean", "read_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ean: str
+    type: MeterType  # Partition de l'archive
+    reading: float
+    read_at: datetime = Field(index=True)
+
+
+class QuarantinedReading(SQLModel, table=True):
+    """Relevé mis en quarantaine par la validation des lots."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ean: str = Field(index=True)
+    reading: float
+    previous_reading: Optional[float] = None
+    read_at: datetime
+    reason: str = Field(index=True)
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Job(SQLModel, table=True):
+    """Modèle de tâche de fond (persistée, survit aux redémarrages)."""
+
+    id: str = Field(default_factory=lambda: uuid4().hex, primary_key=True)
+    kind: str = Field(index=True)
+    status: JobStatus = Field(default=JobStatus.PENDING, index=True)
+    params: Dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(JSON)
+    )
+    result: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = None
+    progress: float = Field(default=0.0)
+    cancel_requested: bool = Field(default=False)
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+
+
+class LocationShard(SQLModel, table=True):
+    """Annuaire des shards : base de chaque emplacement (base globale)."""
+
+    location_id: Optional[int] = Field(default=None, primary_key=True)
+    shard: int
+
+
+class ChangeLog(SQLModel, table=True):
+    """Entrée du journal des modifications (l'ID sert de curseur monotone)."""
+
+    __table_args__ = (Index("ix_changelog_entity_key", "entity", "entity_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str  # "meter", "location" ou "user"
+    entity_id: str
+    operation: ChangeOperation
+    changed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class AuditEvent(SQLModel, table=True):
+    """Événement d'audit : qui a modifié quelle entité, et comment."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    occurred_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    principal_id: Optional[int] = Field(default=None, index=True)
+    entity: str
+    entity_id: str = Field(index=True)
+    action: ChangeOperation
+    changes: Dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(JSON)
+    )
+
+
 # Schémas pour les APIs (utilisant SQLModel comme schéma Pydantic)
 
 
@@ -153,3 +256,94 @@ class MeterRead(MeterBase):
 class MeterUpdate(SQLModel):
     reading: Optional[float] = None
     status: Optional[MeterStatus] = None
+
+
+# Emplacement avec ses relations (?expand=meters,user)
+class LocationDetail(LocationRead):
+    meters: Optional[List[MeterRead]] = None
+    user: Optional[UserRead] = None
+
+
+# Schémas des lots de relevés
+class ReadingIn(SQLModel):
+    ean: str
+    reading: float
+    read_at: Optional[datetime] = None
+
+
+class ReadingBatch(SQLModel):
+    readings: List[ReadingIn]
+
+
+class ReadingBatchResult(SQLModel):
+    accepted: int
+    quarantined: int
+    reasons: Dict[str, int]
+
+
+class ReadingHistoryEntry(SQLModel):
+    reading: float
+    read_at: datetime
+
+
+# Schémas des opérations groupées
+class BulkOperationResult(SQLModel):
+    affected: int
+
+
+class LocationTransfer(SQLModel):
+    target_user_id: int
+
+
+# Schémas Job
+class JobCreate(SQLModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+
+class JobRead(SQLModel):
+    id: str
+    kind: str
+    status: JobStatus
+    progress: float
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# Schémas du journal des modifications
+class ChangeRead(SQLModel):
+    id: int
+    entity: str
+    entity_id: str
+    operation: ChangeOperation
+    changed_at: datetime
+
+
+class ChangeFeed(SQLModel):
+    changes: List[ChangeRead]
+    next_cursor: int
+    has_more: bool
+
+
+# Schémas des statistiques
+class MeterStatGroup(SQLModel):
+    type: MeterType
+    status: MeterStatus
+    count: int
+    reading_total: float
+
+
+class MeterStatsRead(SQLModel):
+    total: int
+    groups: List[MeterStatGroup]
+
+
+# Schémas d'administration
+class SlowQueryRead(SQLModel):
+    statement: str
+    parameters: Any
+    duration_ms: float
+    occurred_at: datetime
@@ -0,0 +1,78 @@
+# Rééquilibrage des shards : python -m app.rebalance
+import argparse
+
+from app.core.sharding import (
+    create_shard_tables,
+    current_shard,
+    move_location,
+    planned_moves,
+    shard_engines,
+    shard_name,
+    sharding_enabled,
+    sync_location_sequence,
+)
+from app.database import create_db_and_tables
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Déplace les emplacements (et leurs compteurs) vers le shard"
+            " désigné par le hachage de leur ID."
+        )
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Répartir sur les N premiers shards (vider les suivants)",
+    )
+    parser.add_argument(
+        "--location", type=int, help="Déplacer un seul emplacement"
+    )
+    parser.add_argument(
+        "--to", type=int, help="Index du shard cible de --location"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Afficher les déplacements sans les effectuer",
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Calcule puis exécute les déplacements, un emplacement à la fois."""
+    args = parse_args()
+    if not sharding_enabled():
+        raise SystemExit("SHARD_URLS est vide : sharding désactivé")
+    if args.shards is not None and not 0 < args.shards <= len(shard_engines):
+        raise SystemExit(f"--shards doit être entre 1 et {len(shard_engines)}")
+    if args.to is not None and shard_name(args.to) not in shard_engines:
+        raise SystemExit(f"Shard inconnu: {args.to}")
+
+    create_db_and_tables()
+    create_shard_tables()
+    if args.location is not None and args.to is not None:
+        source = current_shard(args.location)
+        if source is None:
+            raise SystemExit(f"Emplacement inconnu: {args.location}")
+        moves = [(args.location, source, shard_name(args.to))]
+        moves = [move for move in moves if move[1] != move[2]]
+    else:
+        moves = planned_moves(args.shards)
+        if args.location is not None:
+            moves = [move for move in moves if move[0] == args.location]
+
+    print(f"{len(moves)} emplacement(s) à déplacer")
+    meters = 0
+    for location_id, source, target in moves:
+        print(f"  emplacement {location_id}: {source} -> {target}")
+        if not args.dry_run:
+            meters += move_location(location_id, source, target)
+    if not args.dry_run:
+        sync_location_sequence()
+        print(f"Terminé : {meters} compteur(s) déplacé(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Router d'administration (diagnostic des performances)
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
+
+from app.auth.jwt import get_admin_user
+from app.core.querylog import slow_query_log
+from app.models import SlowQueryRead, User
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+)
+
+
+@router.get("/slow-queries", response_model=List[SlowQueryRead])
+async def get_slow_queries(
+    limit: int = Query(100, ge=1, le=10_000),
+    current_user: User = Depends(get_admin_user),
+):
+    """Dernières requêtes SQL lentes, de la plus récente à la plus ancienne.
+
+    Les valeurs liées sont remplacées par leur type.
+    """
+    return slow_query_log.recent(limit)
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries(
+    current_user: User = Depends(get_admin_user),
+):
+    """Vide le journal des requêtes lentes."""
+    slow_query_log.clear()
+    return None
@@ -0,0 +1,38 @@
+# Router pour le journal des modifications (synchronisation incrémentale)
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from app.auth.jwt import get_employee_or_admin_user
+from app.config import get_settings
+from app.core.changes import read_changes
+from app.database import get_session
+from app.models import ChangeFeed, User
+
+settings = get_settings()
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["changes"],
+)
+
+
+@router.get("/", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(settings.CHANGES_PAGE_SIZE, ge=1, le=10_000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(
+        get_employee_or_admin_user
+    ),  # Systèmes aval (comptes employés) et admin
+):
+    """Liste les modifications postérieures au curseur since.
+
+    Rappeler avec since=next_cursor tant que has_more est vrai. Une entité
+    peut apparaître une seule fois pour plusieurs modifications anciennes
+    (compaction) : relire son état courant via son endpoint.
+    """
+    changes, has_more = read_changes(session, since, limit)
+    next_cursor = changes[-1].id if changes else since
+    return ChangeFeed(
+        changes=changes, next_cursor=next_cursor, has_more=has_more
+    )
@@ -0,0 +1,86 @@
+# Router pour les tâches de fond
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlmodel import Session
+
+from app.auth.jwt import get_current_active_user
+from app.core import job_handlers  # noqa: F401 (enregistre les tâches)
+from app.core.jobs import JOB_HANDLERS, request_cancellation, submit_job
+from app.database import get_session
+from app.models import Job, JobCreate, JobRead, User, UserRole
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+)
+
+
+@router.put("/", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job: JobCreate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Soumet une tâche de fond; son état se consulte via /jobs/{id}."""
+    if job.kind not in JOB_HANDLERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Type de tâche inconnu: {job.kind}",
+        )
+
+    # Vérifier que le rôle de l'utilisateur autorise ce type de tâche
+    _, roles = JOB_HANDLERS[job.kind]
+    if current_user.role not in roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Privilèges insuffisants",
+        )
+
+    return submit_job(session, job.kind, job.params, owner_id=current_user.id)
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Récupère l'état, la progression et le résultat d'une tâche."""
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tâche avec l'ID {job_id} non trouvée",
+        )
+
+    # Seul l'auteur de la tâche ou un administrateur peut la consulter
+    if current_user.role != UserRole.ADMIN and job.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès non autorisé à cette tâche",
+        )
+
+    return job
+
+
+@router.post("/{job_id}:cancel", response_model=JobRead)
+async def cancel_job(
+    job_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Annule une tâche en attente, ou arrête une tâche en cours."""
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tâche avec l'ID {job_id} non trouvée",
+        )
+
+    # Seul l'auteur de la tâche ou un administrateur peut l'annuler
+    if current_user.role != UserRole.ADMIN and job.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès non autorisé à cette tâche",
+        )
+
+    return request_cancellation(session, job)
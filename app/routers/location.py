@@ -1,17 +1,29 @@
 # Router pour les emplacements
-from typing import List
+from typing import List, Optional, Set
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 
 from app.auth.jwt import get_current_active_user, get_employee_or_admin_user
+from app.core import bulk, search
+from app.core.audit import audit_log, diff, snapshot
+from app.core.changes import record_change
+from app.core.loaders import (
+    LOCATION_EXPANSIONS,
+    LOCATION_WITHOUT_RELATIONS,
+    expand_locations,
+)
+from app.core.sharding import exec_all
 from app.database import get_session
 from app.models import (
+    BulkOperationResult,
+    ChangeOperation,
     Location,
     LocationCreate,
+    LocationDetail,
     LocationRead,
     LocationUpdate,
-    Meter,
+    MeterStatus,
     User,
     UserRole,
 )
@@ -22,8 +34,46 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[LocationRead])
+def parse_expand(
+    expand: Optional[str] = Query(
+        None, description="Relations à inclure : meters, user"
+    ),
+) -> Set[str]:
+    """Relations demandées par ?expand=meters,user."""
+    if not expand:
+        return set()
+    requested = {name.strip() for name in expand.split(",") if name.strip()}
+    unknown = requested.difference(LOCATION_EXPANSIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Relation inconnue: {', '.join(sorted(unknown))}",
+        )
+    return requested
+
+
+def location_details(
+    session: Session, locations: List[Location], expand: Set[str]
+) -> List[LocationDetail]:
+    """Emplacements avec les relations demandées, chargées par lots."""
+    expansions = expand_locations(session, locations, expand)
+    return [
+        # Champs de LocationRead seulement : les relations non demandées
+        # restent absentes de la réponse
+        LocationDetail(
+            **LocationRead.model_validate(location).model_dump(), **extra
+        )
+        for location, extra in zip(locations, expansions)
+    ]
+
+
+@router.get(
+    "/",
+    response_model=List[LocationDetail],
+    response_model_exclude_unset=True,
+)
 async def get_locations(
+    expand: Set[str] = Depends(parse_expand),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -35,8 +85,9 @@ async def get_locations(
     else:
         statement = select(Location).where(Location.user_id == current_user.id)
 
-    locations = session.exec(statement).all()
-    return locations
+    statement = statement.options(*LOCATION_WITHOUT_RELATIONS)
+    locations = await exec_all(session, statement)
+    return location_details(session, locations, expand)
 
 
 @router.put(
@@ -75,20 +126,53 @@ async def create_location(
     )
 
     session.add(new_location)
+    session.flush()  # Attribue l'ID pour le journal
+    record_change(session, "location", new_location.id, ChangeOperation.CREATE)
     session.commit()
     session.refresh(new_location)
+    audit_log.record(
+        current_user.id,
+        "location",
+        new_location.id,
+        ChangeOperation.CREATE,
+        snapshot(new_location),
+    )
     return new_location
 
 
-@router.get("/{location_id}", response_model=LocationRead)
+@router.get("/search", response_model=List[LocationRead])
+async def search_locations(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Recherche les emplacements par nom approché, classés par pertinence."""
+    # Les consommateurs ne voient que leurs emplacements
+    user_id = (
+        current_user.id if current_user.role == UserRole.CONSUMER else None
+    )
+    return search.search_locations(session, q, limit, user_id)
+
+
+@router.get(
+    "/{location_id}",
+    response_model=LocationDetail,
+    response_model_exclude_unset=True,
+)
 async def get_location(
     location_id: int,
+    expand: Set[str] = Depends(parse_expand),
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_active_user),
 ):
     """Récupère les détails d'un emplacement et ses compteurs associés."""
     # Récupérer l'emplacement
-    statement = select(Location).where(Location.id == location_id)
+    statement = (
+        select(Location)
+        .where(Location.id == location_id)
+        .options(*LOCATION_WITHOUT_RELATIONS)
+    )
     location = session.exec(statement).first()
     if not location:
         raise HTTPException(
@@ -106,7 +190,7 @@ async def get_location(
             detail="Accès non autorisé à cet emplacement",
         )
 
-    return location
+    return location_details(session, [location], expand)[0]
 
 
 @router.patch("/{location_id}", response_model=LocationRead)
@@ -149,38 +233,84 @@ async def update_location(
             )
 
     # Mettre à jour les champs fournis
+    before = snapshot(location)
     location_data = location_update.dict(exclude_unset=True)
     for key, value in location_data.items():
         setattr(location, key, value)
 
     session.add(location)
+    record_change(session, "location", location.id, ChangeOperation.UPDATE)
     session.commit()
     session.refresh(location)
+    audit_log.record(
+        current_user.id,
+        "location",
+        location.id,
+        ChangeOperation.UPDATE,
+        diff(before, snapshot(location)),
+    )
     return location
 
 
+@router.post("/{location_id}/meters:close", response_model=BulkOperationResult)
+async def close_location_meters(
+    location_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(
+        get_employee_or_admin_user
+    ),  # Employés et admin peuvent modifier
+):
+    """Ferme en une seule requête les compteurs ouverts d'un emplacement."""
+    if not bulk.location_exists(session, location_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Emplacement avec l'ID {location_id} non trouvé",
+        )
+
+    eans = bulk.close_location_meters(session, location_id)
+    session.commit()
+    audit_log.record(
+        current_user.id,
+        "location",
+        location_id,
+        ChangeOperation.UPDATE,
+        {"operation": "meters:close", "affected": len(eans)},
+    )
+    audit_log.record_each(
+        current_user.id,
+        "meter",
+        eans,
+        ChangeOperation.UPDATE,
+        {"status": [MeterStatus.OPEN.value, MeterStatus.CLOSE.value]},
+    )
+    return BulkOperationResult(affected=len(eans))
+
+
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_location(
     location_id: int,
+    cascade: bool = False,
     session: Session = Depends(get_session),
     current_user: User = Depends(
         get_employee_or_admin_user
     ),  # Employés et admin peuvent supprimer
 ):
-    """Supprime un emplacement s'il n'y a plus de compteurs associés."""
-    # Récupérer l'emplacement
-    statement = select(Location).where(Location.id == location_id)
-    location = session.exec(statement).first()
-    if not location:
+    """Supprime un emplacement, avec ses compteurs si cascade=true."""
+    # La suppression en cascade supprime aussi des compteurs : admin seul
+    if cascade and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seul un administrateur peut supprimer des compteurs",
+        )
+
+    if not bulk.location_exists(session, location_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Emplacement avec l'ID {location_id} non trouvé",
         )
 
-    # Vérifier s'il y a des compteurs associés
-    meter_statement = select(Meter).where(Meter.location_id == location_id)
-    meters = session.exec(meter_statement).all()
-    if meters:
+    # Sans cascade, refuser s'il reste des compteurs (EXISTS, sans les charger)
+    if not cascade and bulk.location_has_meters(session, location_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=(
@@ -189,6 +319,20 @@ async def delete_location(
             ),
         )
 
-    session.delete(location)
+    deleted = bulk.delete_location(session, location_id, cascade=cascade)
     session.commit()
+    audit_log.record(
+        current_user.id,
+        "location",
+        location_id,
+        ChangeOperation.DELETE,
+        {"cascade": cascade, "meters_deleted": len(deleted)},
+    )
+    audit_log.record_each(
+        current_user.id,
+        "meter",
+        deleted,
+        ChangeOperation.DELETE,
+        {"location_id": location_id},
+    )
     return None
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlmodel import Session, select
 
 from app.auth.jwt import (
@@ -9,14 +11,25 @@ from app.auth.jwt import (
     get_current_active_user,
     get_employee_or_admin_user,
 )
+from app.core import search
+from app.core.audit import audit_log, diff, snapshot
+from app.core.changes import record_change
+from app.core.sharding import exec_all
+from app.core.stats import add_meter_stats, move_meter_stats, stat_key
+from app.core.writer import write_queue
 from app.database import get_session
 from app.models import (
+    ChangeOperation,
     Location,
     Meter,
     MeterCreate,
     MeterRead,
+    MeterReading,
     MeterType,
     MeterUpdate,
+    ReadingBatch,
+    ReadingBatchResult,
+    ReadingHistoryEntry,
     User,
     UserRole,
 )
@@ -26,6 +39,32 @@ router = APIRouter(
     tags=["meters"],
 )
 
+# Corps documenté de POST /meter/readings (lu directement, sans paramètre)
+READINGS_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": ReadingBatch.model_json_schema()},
+            "application/msgpack": {
+                "schema": {
+                    "type": "object",
+                    "description": (
+                        "Colonnes eans, readings et read_at (microsecondes"
+                        " depuis l'epoch UTC, facultatif)"
+                    ),
+                }
+            },
+            "application/x-protobuf": {
+                "schema": {
+                    "type": "string",
+                    "format": "binary",
+                    "description": "Message ReadingBatch (readings.proto)",
+                }
+            },
+        },
+    }
+}
+
 
 @router.get("/", response_model=List[MeterRead])
 async def get_meters(
@@ -53,7 +92,7 @@ async def get_meters(
         else:
             return []  # Aucun emplacement, donc aucun compteur
 
-    meters = session.exec(statement).all()
+    meters = await exec_all(session, statement)
     return meters
 
 
@@ -66,48 +105,139 @@ async def create_meter(
     ),  # Employés et admin peuvent créer
 ):
     """Crée un nouveau compteur."""
-    # Vérifier si l'emplacement associé existe
-    statement = select(Location).where(Location.id == meter.location_id)
-    location = session.exec(statement).first()
-    if not location:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Emplacement avec l'ID {meter.location_id} non trouvé",
+
+    # Exécutée par la file d'écriture, groupée avec les écritures concurrentes
+    def apply_create(session: Session):
+        # Vérifier si l'emplacement associé existe
+        statement = select(Location).where(Location.id == meter.location_id)
+        location = session.exec(statement).first()
+        if not location:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Emplacement avec l'ID {meter.location_id} non trouvé",
+            )
+
+        # Vérifier si l'EAN existe déjà
+        existing_statement = select(Meter).where(Meter.ean == meter.ean)
+        existing_meter = session.exec(existing_statement).first()
+        if existing_meter:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Un compteur avec l'EAN {meter.ean} existe déjà",
+            )
+
+        # Déterminer l'unité en fonction du type
+        unit = ""
+        if meter.type == MeterType.GAS:
+            unit = "m³"
+        elif meter.type == MeterType.WATER:
+            unit = "m³"
+        elif meter.type == MeterType.ELECTRICITY:
+            unit = "kWh"
+
+        # Créer le nouveau compteur
+        new_meter = Meter(
+            ean=meter.ean,
+            status=meter.status,
+            type=meter.type,
+            reading=meter.reading,
+            unit=unit,
+            location_id=meter.location_id,
+            last_update=datetime.utcnow(),
         )
 
-    # Vérifier si l'EAN existe déjà
-    existing_statement = select(Meter).where(Meter.ean == meter.ean)
-    existing_meter = session.exec(existing_statement).first()
-    if existing_meter:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Un compteur avec l'EAN {meter.ean} existe déjà",
+        session.add(new_meter)
+        session.add(
+            MeterReading(
+                ean=new_meter.ean,
+                type=new_meter.type,
+                reading=new_meter.reading,
+                read_at=new_meter.last_update,
+            )
         )
+        record_change(session, "meter", new_meter.ean, ChangeOperation.CREATE)
+        add_meter_stats(session, new_meter)
+        session.flush()
+        return MeterRead.model_validate(new_meter), snapshot(new_meter)
+
+    # Rendre la connexion de la requête au pool pendant l'attente de la file
+    session.close()
+    created, created_snapshot = await write_queue.submit(apply_create)
+    audit_log.record(
+        current_user.id,
+        "meter",
+        created.ean,
+        ChangeOperation.CREATE,
+        created_snapshot,
+    )
+    return created
+
+
+@router.post(
+    "/readings",
+    response_model=ReadingBatchResult,
+    openapi_extra=READINGS_REQUEST_BODY,
+)
+async def ingest_readings(
+    request: Request,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(
+        get_employee_or_admin_user
+    ),  # Employés et admin peuvent modifier
+):
+    """Valide un lot de relevés et met les relevés suspects en quarantaine.
 
-    # Déterminer l'unité en fonction du type
-    unit = ""
-    if meter.type == MeterType.GAS:
-        unit = "m³"
-    elif meter.type == MeterType.WATER:
-        unit = "m³"
-    elif meter.type == MeterType.ELECTRICITY:
-        unit = "kWh"
-
-    # Créer le nouveau compteur
-    new_meter = Meter(
-        ean=meter.ean,
-        status=meter.status,
-        type=meter.type,
-        reading=meter.reading,
-        unit=unit,
-        location_id=meter.location_id,
-        last_update=datetime.utcnow(),
+    Le lot est accepté en JSON, en MessagePack ou en Protobuf selon le
+    Content-Type; les formats binaires sont décodés directement en colonnes.
+    """
+    # Imports différés au premier usage : NumPy n'est pas chargé au démarrage
+    from app.core.reading_formats import (
+        MSGPACK_CONTENT_TYPES,
+        PROTOBUF_CONTENT_TYPES,
+        ReadingFormatError,
+        decode_json,
+        decode_msgpack,
+        decode_protobuf,
     )
+    from app.core.validation import ingest_batch
 
-    session.add(new_meter)
-    session.commit()
-    session.refresh(new_meter)
-    return new_meter
+    content_type = request.headers.get("content-type", "application/json")
+    content_type = content_type.split(";")[0].strip().lower()
+    body = await request.body()
+    try:
+        if content_type in MSGPACK_CONTENT_TYPES:
+            columns = decode_msgpack(body)
+        elif content_type in PROTOBUF_CONTENT_TYPES:
+            columns = decode_protobuf(body)
+        elif content_type == "application/json":
+            columns = decode_json(body)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Format de lot non pris en charge: {content_type}",
+            )
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+    except ReadingFormatError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return ingest_batch(session, *columns, principal_id=current_user.id)
+
+
+@router.get("/search", response_model=List[MeterRead])
+async def search_meters(
+    q: str = Query(..., min_length=1, max_length=18),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Recherche les compteurs dont l'EAN commence par q."""
+    # Les consommateurs ne voient que les compteurs de leurs emplacements
+    user_id = (
+        current_user.id if current_user.role == UserRole.CONSUMER else None
+    )
+    return search.search_meters(session, q, limit, user_id)
 
 
 @router.get("/{ean}", response_model=MeterRead)
@@ -143,6 +273,37 @@ async def get_meter(
     return meter
 
 
+@router.get("/{ean}/history", response_model=List[ReadingHistoryEntry])
+async def get_meter_history(
+    ean: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Historique des relevés d'un compteur, archives comprises."""
+    meter = session.get(Meter, ean)
+    if not meter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Compteur avec l'EAN {ean} non trouvé",
+        )
+
+    # Les consommateurs ne voient que les compteurs de leurs emplacements
+    if current_user.role == UserRole.CONSUMER:
+        location = session.get(Location, meter.location_id)
+        if location is None or location.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Accès non autorisé à ce compteur",
+            )
+
+    from app.core.archive import read_history  # Import différé (NumPy)
+
+    return read_history(session, ean, meter.type, start, end, limit)
+
+
 @router.patch("/{ean}", response_model=MeterRead)
 async def update_meter(
     ean: str,
@@ -153,35 +314,61 @@ async def update_meter(
     ),  # Employés et admin peuvent modifier
 ):
     """Met à jour la valeur ou le statut d'un compteur."""
-    # Récupérer le compteur
-    statement = select(Meter).where(Meter.ean == ean)
-    meter = session.exec(statement).first()
-    if not meter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Compteur avec l'EAN {ean} non trouvé",
-        )
 
-    # Mettre à jour la valeur ou le statut
-    if meter_update.reading is not None:
-        # Vérifier que la nouvelle valeur est supérieure à l'ancienne
-        if meter_update.reading <= meter.reading:
+    # Exécutée par la file d'écriture, groupée avec les écritures concurrentes
+    def apply_update(session: Session):
+        # Récupérer le compteur
+        statement = select(Meter).where(Meter.ean == ean)
+        meter = session.exec(statement).first()
+        if not meter:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La nouvelle valeur doit être supérieure à l'ancienne",
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Compteur avec l'EAN {ean} non trouvé",
             )
-        meter.reading = meter_update.reading
 
-    if meter_update.status is not None:
-        meter.status = meter_update.status
+        before = snapshot(meter)
+        previous_key = stat_key(meter.location_id, meter.type, meter.status)
+        previous_reading = meter.reading
 
-    # Mettre à jour la date de dernière mise à jour
-    meter.last_update = datetime.utcnow()
+        # Mettre à jour la valeur ou le statut
+        if meter_update.reading is not None:
+            # Vérifier que la nouvelle valeur est supérieure à l'ancienne
+            if meter_update.reading <= meter.reading:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=(
+                        "La nouvelle valeur doit être supérieure à l'ancienne"
+                    ),
+                )
+            meter.reading = meter_update.reading
 
-    session.add(meter)
-    session.commit()
-    session.refresh(meter)
-    return meter
+        if meter_update.status is not None:
+            meter.status = meter_update.status
+
+        # Mettre à jour la date de dernière mise à jour
+        meter.last_update = datetime.utcnow()
+
+        session.add(meter)
+        if meter_update.reading is not None:
+            session.add(
+                MeterReading(
+                    ean=meter.ean,
+                    type=meter.type,
+                    reading=meter.reading,
+                    read_at=meter.last_update,
+                )
+            )
+        record_change(session, "meter", meter.ean, ChangeOperation.UPDATE)
+        move_meter_stats(session, previous_key, previous_reading, meter)
+        return MeterRead.model_validate(meter), diff(before, snapshot(meter))
+
+    # Rendre la connexion de la requête au pool pendant l'attente de la file
+    session.close()
+    updated, changes = await write_queue.submit(apply_update)
+    audit_log.record(
+        current_user.id, "meter", ean, ChangeOperation.UPDATE, changes
+    )
+    return updated
 
 
 @router.delete("/{ean}", status_code=status.HTTP_204_NO_CONTENT)
@@ -193,15 +380,28 @@ async def delete_meter(
     ),  # Seul l'admin peut supprimer
 ):
     """Supprime un compteur."""
-    # Récupérer le compteur
-    statement = select(Meter).where(Meter.ean == ean)
-    meter = session.exec(statement).first()
-    if not meter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Compteur avec l'EAN {ean} non trouvé",
-        )
 
-    session.delete(meter)
-    session.commit()
+    # Exécutée par la file d'écriture, groupée avec les écritures concurrentes
+    def apply_delete(session: Session):
+        # Récupérer le compteur
+        statement = select(Meter).where(Meter.ean == ean)
+        meter = session.exec(statement).first()
+        if not meter:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Compteur avec l'EAN {ean} non trouvé",
+            )
+
+        deleted = snapshot(meter)
+        session.delete(meter)
+        record_change(session, "meter", meter.ean, ChangeOperation.DELETE)
+        add_meter_stats(session, meter, sign=-1)
+        return deleted
+
+    # Rendre la connexion de la requête au pool pendant l'attente de la file
+    session.close()
+    deleted = await write_queue.submit(apply_delete)
+    audit_log.record(
+        current_user.id, "meter", ean, ChangeOperation.DELETE, deleted
+    )
     return None  # Router pour les compteurs
@@ -0,0 +1,77 @@
+# Router pour les statistiques du parc de compteurs
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import exists
+from sqlmodel import Session, select
+
+from app.auth.jwt import get_current_active_user, get_employee_or_admin_user
+from app.core import stats
+from app.database import get_session
+from app.models import Location, MeterStat, MeterStatsRead, User, UserRole
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+)
+
+
+@router.get("/", response_model=MeterStatsRead)
+async def get_fleet_stats(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_employee_or_admin_user),
+):
+    """Nombre de compteurs et total des relevés par type et statut."""
+    return stats.summarize_stats(session)
+
+
+@router.get("/locations/{location_id}", response_model=MeterStatsRead)
+async def get_location_stats(
+    location_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Statistiques des compteurs d'un emplacement."""
+    # Charger seulement le propriétaire, pas l'emplacement et ses compteurs
+    statement = select(Location.id, Location.user_id).where(
+        Location.id == location_id
+    )
+    location = session.exec(statement).first()
+    if location is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Emplacement avec l'ID {location_id} non trouvé",
+        )
+
+    # Vérifier les permissions
+    if (
+        current_user.role == UserRole.CONSUMER
+        and location.user_id != current_user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès non autorisé à cet emplacement",
+        )
+
+    return stats.summarize_stats(session, MeterStat.location_id == location_id)
+
+
+@router.get("/users/{user_id}", response_model=MeterStatsRead)
+async def get_user_stats(
+    user_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Statistiques des compteurs de tous les emplacements d'un utilisateur."""
+    # Vérifier les permissions
+    if current_user.role == UserRole.CONSUMER and current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès non autorisé",
+        )
+
+    if not session.exec(select(exists().where(User.id == user_id))).one():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Utilisateur avec l'ID {user_id} non trouvé",
+        )
+
+    return stats.user_stats(session, user_id)
@@ -2,15 +2,30 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import exists
 from sqlmodel import Session, select
 
 from app.auth.jwt import (
     get_admin_user,
     get_current_active_user,
+    get_employee_or_admin_user,
 )
 from app.auth.password import get_password_hash
+from app.core import bulk
+from app.core.audit import REDACTED, audit_log, diff, snapshot
+from app.core.changes import record_change, record_changes_from_select
 from app.database import get_session
-from app.models import User, UserCreate, UserRead, UserRole, UserUpdate
+from app.models import (
+    BulkOperationResult,
+    ChangeOperation,
+    Location,
+    LocationTransfer,
+    User,
+    UserCreate,
+    UserRead,
+    UserRole,
+    UserUpdate,
+)
 
 router = APIRouter(
     prefix="/user",
@@ -65,8 +80,17 @@ async def create_user(
     )
 
     session.add(new_user)
+    session.flush()  # Attribue l'ID pour le journal
+    record_change(session, "user", new_user.id, ChangeOperation.CREATE)
     session.commit()
     session.refresh(new_user)
+    audit_log.record(
+        current_user.id,
+        "user",
+        new_user.id,
+        ChangeOperation.CREATE,
+        snapshot(new_user),
+    )
     return new_user
 
 
@@ -128,6 +152,7 @@ async def update_user(
         )
 
     # Mettre à jour les champs fournis
+    before = snapshot(user)
     user_data = user_update.dict(exclude_unset=True)
     if "password" in user_data:
         user_data["password"] = get_password_hash(user_data["password"])
@@ -136,11 +161,88 @@ async def update_user(
         setattr(user, key, value)
 
     session.add(user)
+    record_change(session, "user", user.id, ChangeOperation.UPDATE)
     session.commit()
     session.refresh(user)
+    changes = diff(before, snapshot(user))
+    if "password" in user_data:
+        changes["password"] = [REDACTED, REDACTED]
+    audit_log.record(
+        current_user.id, "user", user.id, ChangeOperation.UPDATE, changes
+    )
     return user
 
 
+@router.post(
+    "/{user_id}/locations:transfer", response_model=BulkOperationResult
+)
+async def transfer_locations(
+    user_id: int,
+    transfer: LocationTransfer,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(
+        get_employee_or_admin_user
+    ),  # Employés et admin peuvent modifier les emplacements
+):
+    """Transfère en une seule requête les emplacements vers un autre
+    consommateur."""
+    if transfer.target_user_id == user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="L'utilisateur cible doit être différent de la source",
+        )
+
+    # Vérifier l'existence de la source sans charger ses emplacements
+    source_statement = select(exists().where(User.id == user_id))
+    if not session.exec(source_statement).one():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Utilisateur avec l'ID {user_id} non trouvé",
+        )
+
+    # Vérifier que la cible existe et est un consommateur
+    target_statement = select(User.role).where(
+        User.id == transfer.target_user_id
+    )
+    target_role = session.exec(target_statement).first()
+    if target_role is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=(
+                f"Utilisateur avec l'ID {transfer.target_user_id} non trouvé"
+            ),
+        )
+    if target_role != UserRole.CONSUMER:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Seuls les consommateurs peuvent avoir des emplacements",
+        )
+
+    location_ids = bulk.transfer_locations(
+        session, user_id, transfer.target_user_id
+    )
+    session.commit()
+    audit_log.record(
+        current_user.id,
+        "user",
+        user_id,
+        ChangeOperation.UPDATE,
+        {
+            "operation": "locations:transfer",
+            "target_user_id": transfer.target_user_id,
+            "affected": len(location_ids),
+        },
+    )
+    audit_log.record_each(
+        current_user.id,
+        "location",
+        location_ids,
+        ChangeOperation.UPDATE,
+        {"user_id": [user_id, transfer.target_user_id]},
+    )
+    return BulkOperationResult(affected=len(location_ids))
+
+
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
@@ -166,6 +268,26 @@ async def delete_user(
             detail="Vous ne pouvez pas vous supprimer vous-même",
         )
 
+    deleted = snapshot(user)
+    # Les emplacements de l'utilisateur sont détachés par la suppression
+    location_ids = record_changes_from_select(
+        session,
+        "location",
+        Location.id,
+        Location.user_id == user.id,
+        ChangeOperation.UPDATE,
+    )
     session.delete(user)
+    record_change(session, "user", user.id, ChangeOperation.DELETE)
     session.commit()
+    audit_log.record(
+        current_user.id, "user", user_id, ChangeOperation.DELETE, deleted
+    )
+    audit_log.record_each(
+        current_user.id,
+        "location",
+        location_ids,
+        ChangeOperation.UPDATE,
+        {"user_id": [user_id, None]},
+    )
     return None
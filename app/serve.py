@@ -0,0 +1,117 @@
+# Point d'entrée de production : python -m app.serve
+import importlib.util
+import math
+import os
+from typing import Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.config import get_settings
+from app.core.startup import StartupTimer, bootstrap, bootstrap_marker_present
+
+settings = get_settings()
+
+
+def _read_first_line(path: str) -> Optional[str]:
+    """Lit la première ligne d'un fichier système, None s'il est absent."""
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """Retourne le quota CPU du conteneur (cgroup v2 puis v1), s'il existe."""
+    # cgroup v2 : "<quota> <période>" ou "max <période>"
+    cpu_max = _read_first_line("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1
+    quota = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus() -> int:
+    """Nombre de CPU réellement utilisables par le processus."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Plateformes sans sched_getaffinity
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    """Nombre de workers : WEB_CONCURRENCY ou un worker par CPU disponible."""
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    return available_cpus()
+
+
+def _installed(module: str) -> bool:
+    """Indique si un module optionnel est installé."""
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    """Démarre uvicorn avec la configuration de production."""
+    # Amorcer la base une seule fois, avant de lancer les workers
+    if not bootstrap_marker_present():
+        timer = StartupTimer()
+        bootstrap(timer)
+        print(timer.report())
+
+    # Chaque worker préchauffe ses ressources avant d'accepter du trafic :
+    # variable d'environnement pour les processus workers, et configuration
+    # déjà chargée (partagée via get_settings) pour un serveur sans
+    # superviseur, qui tourne dans ce processus
+    os.environ["WARMUP_ON_STARTUP"] = "True"
+    settings.WARMUP_ON_STARTUP = True
+
+    workers = worker_count()
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    print(
+        f"Démarrage de {workers} worker(s) sur"
+        f" {settings.HOST}:{settings.PORT} (loop={loop}, http={http})"
+    )
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=settings.KEEP_ALIVE,
+        backlog=settings.BACKLOG,
+        # Recyclage des workers après N requêtes (0 = désactivé), avec une
+        # gigue pour éviter qu'ils redémarrent tous en même temps
+        limit_max_requests=settings.MAX_REQUESTS or None,
+        limit_max_requests_jitter=settings.MAX_REQUESTS_JITTER,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=settings.DEBUG,
+    )
+    if workers > 1 or settings.MAX_REQUESTS:
+        # Le superviseur remplace un worker recyclé, même s'il est seul :
+        # sans lui, MAX_REQUESTS arrêterait tout le serveur
+        Multiprocess(config, sockets=[config.bind_socket()]).run()
+    else:
+        uvicorn.Server(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# Lus à l'import de l'application : base temporaire, sans sharding,
+# limitation de débit ni tâches périodiques
+DATA_DIR = tempfile.mkdtemp(prefix="meter-tests-")
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{DATA_DIR}/meter.db",
+        "BOOTSTRAP_MARKER": f"{DATA_DIR}/.meter_bootstrapped",
+        "SHARD_URLS": "",
+        "WARMUP_ON_STARTUP": "False",
+        "RATE_LIMIT_ENABLED": "False",
+        "LOAD_SHEDDING_ENABLED": "False",
+        "CHANGES_COMPACTION_INTERVAL": "0",
+        "STATS_RECONCILE_INTERVAL": "0",
+        "AUDIT_DIR": f"{DATA_DIR}/audit",
+        "READINGS_ARCHIVE_DIR": f"{DATA_DIR}/archive",
+    }
+)
+
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin_secure_password"
+
+# EAN et adresses uniques : la base est partagée par toute la session
+_numbers = itertools.count(1)
+
+
+def auth_headers(client, email: str, password: str) -> dict:
+    response = client.post(
+        "/token", data={"username": email, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return auth_headers(client, ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+@pytest.fixture
+def make_user(client, admin_headers):
+    """Crée un consommateur; retourne l'utilisateur créé."""
+
+    def make_user(role: str = "consumer") -> dict:
+        number = next(_numbers)
+        response = client.put(
+            "/user/",
+            headers=admin_headers,
+            json={
+                "name": f"Client {number}",
+                "email": f"client{number}@example.com",
+                "password": "secret",
+                "role": role,
+            },
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make_user
+
+
+@pytest.fixture
+def make_location(client, admin_headers, make_user):
+    """Crée un emplacement (pour un nouveau consommateur par défaut)."""
+
+    def make_location(user_id: int = None, name: str = None) -> dict:
+        if user_id is None:
+            user_id = make_user()["id"]
+        response = client.put(
+            "/location/",
+            headers=admin_headers,
+            json={
+                "name": name or f"Site {next(_numbers)}",
+                "lat": 50.85,
+                "lon": 4.35,
+                "user_id": user_id,
+            },
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make_location
+
+
+@pytest.fixture
+def make_meter(client, admin_headers):
+    """Crée un compteur dans un emplacement; retourne le compteur créé."""
+
+    def make_meter(
+        location_id: int, reading: float = 100.0, meter_type: str = "gas"
+    ) -> dict:
+        response = client.put(
+            "/meter/",
+            headers=admin_headers,
+            json={
+                "ean": f"5414{next(_numbers):014d}",
+                "type": meter_type,
+                "reading": reading,
+                "location_id": location_id,
+            },
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make_meter
@@ -0,0 +1,123 @@
+import asyncio
+
+from sqlmodel import Session, select
+
+from app.core.audit import AuditLog, audit_log, settings
+from app.database import engine
+from app.models import AuditEvent, ChangeOperation
+
+
+class ListSink:
+    """Destination en mémoire : garde les lots écrits."""
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, events):
+        self.batches.append([event["entity_id"] for event in events])
+
+    def close(self):
+        self.closed = True
+
+
+def audited(entity: str, entity_ids) -> list:
+    """Événements d'audit des entités, après écriture de la file."""
+    audit_log.flush()
+    with Session(engine) as session:
+        rows = session.exec(
+            select(AuditEvent).where(
+                (AuditEvent.entity == entity)
+                & AuditEvent.entity_id.in_([str(id) for id in entity_ids])
+            )
+        ).all()
+    return [(row.entity_id, row.action.value) for row in rows]
+
+
+def record_then_stop(log: AuditLog, entity_ids) -> None:
+    async def scenario():
+        await log.start()
+        log.record_each(1, "meter", entity_ids, ChangeOperation.UPDATE)
+        # Ni lot complet ni intervalle écoulé : rien n'est encore écrit
+        assert log.sink.batches == []
+        await log.stop()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_newest_events(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_QUEUE_SIZE", 3)
+    monkeypatch.setattr(settings, "AUDIT_FLUSH_INTERVAL", 60)
+    log = AuditLog(ListSink())
+
+    record_then_stop(log, range(5))
+
+    assert log.dropped == 2
+    assert log.sink.batches == [["0", "1", "2"]]
+
+
+def test_stop_flushes_pending_events(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "AUDIT_FLUSH_INTERVAL", 60)
+    log = AuditLog(ListSink())
+
+    async def scenario():
+        await log.start()
+        log.record(1, "meter", "a", ChangeOperation.UPDATE)
+        assert log.sink.batches == []
+        log.record_each(1, "meter", ["b", "c", "d"], ChangeOperation.UPDATE)
+        await log.stop()
+
+    asyncio.run(scenario())
+
+    # Lots de AUDIT_BATCH_SIZE, dans l'ordre d'enregistrement
+    events = [entity_id for batch in log.sink.batches for entity_id in batch]
+    assert events == ["a", "b", "c", "d"]
+    assert all(len(batch) <= 2 for batch in log.sink.batches)
+    assert log.dropped == 0
+    assert log.sink.closed
+
+
+def test_stopped_log_writes_inline():
+    log = AuditLog(ListSink())
+    log.record(1, "meter", "a", ChangeOperation.DELETE)
+    assert log.sink.batches == [["a"]]
+
+
+def test_bulk_operations_audit_each_entity(
+    client, admin_headers, make_user, make_location, make_meter
+):
+    source, target = make_user(), make_user()
+    location = make_location(source["id"])
+    eans = [make_meter(location["id"])["ean"] for _ in range(3)]
+
+    response = client.post(
+        f"/location/{location['id']}/meters:close", headers=admin_headers
+    )
+    assert response.json() == {"affected": 3}
+    assert sorted(audited("meter", eans)) == sorted(
+        [(ean, "create") for ean in eans] + [(ean, "update") for ean in eans]
+    )
+
+    response = client.post(
+        f"/user/{source['id']}/locations:transfer",
+        headers=admin_headers,
+        json={"target_user_id": target["id"]},
+    )
+    assert response.json() == {"affected": 1}
+    response = client.delete(
+        f"/location/{location['id']}?cascade=true", headers=admin_headers
+    )
+    assert response.status_code == 204
+
+    # Une ligne par compteur et par opération, groupée ou non
+    assert sorted(audited("meter", eans)) == sorted(
+        (ean, action)
+        for ean in eans
+        for action in ("create", "update", "delete")
+    )
+    # Emplacement : création, fermeture, transfert et suppression
+    assert sorted(audited("location", [location["id"]])) == sorted(
+        (str(location["id"]), action)
+        for action in ("create", "update", "update", "delete")
+    )
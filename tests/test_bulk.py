@@ -0,0 +1,212 @@
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import ChangeLog, Location, Meter, MeterStat
+
+MISSING_ID = 999_999
+
+
+def latest_change_id() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.max(ChangeLog.id))).one() or 0
+
+
+def changes_since(cursor: int) -> list:
+    """Entrées du journal postérieures au curseur : (entité, ID, opération)."""
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ChangeLog)
+            .where(ChangeLog.id > cursor)
+            .order_by(ChangeLog.id)
+        ).all()
+    return [(row.entity, row.entity_id, row.operation.value) for row in rows]
+
+
+def location_stats(client, headers, location_id: int) -> dict:
+    response = client.get(f"/stats/locations/{location_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return {
+        (group["type"], group["status"]): (
+            group["count"],
+            group["reading_total"],
+        )
+        for group in response.json()["groups"]
+    }
+
+
+def test_close_location_meters(
+    client, admin_headers, make_location, make_meter
+):
+    location = make_location()
+    meters = [
+        make_meter(location["id"], reading=reading)
+        for reading in (10.0, 20.0, 30.0)
+    ]
+    already_closed = meters[0]["ean"]
+    response = client.patch(
+        f"/meter/{already_closed}",
+        headers=admin_headers,
+        json={"status": "close"},
+    )
+    assert response.status_code == 200
+    cursor = latest_change_id()
+
+    response = client.post(
+        f"/location/{location['id']}/meters:close", headers=admin_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"affected": 2}
+    with Session(engine) as session:
+        statuses = session.exec(
+            select(Meter.status).where(Meter.location_id == location["id"])
+        ).all()
+    assert [status.value for status in statuses] == ["close"] * 3
+    assert sorted(changes_since(cursor)) == sorted(
+        ("meter", meter["ean"], "update") for meter in meters[1:]
+    )
+    assert location_stats(client, admin_headers, location["id"]) == {
+        ("gas", "close"): (3, 60.0)
+    }
+
+    # Plus aucun compteur ouvert : rien à fermer ni à journaliser
+    cursor = latest_change_id()
+    response = client.post(
+        f"/location/{location['id']}/meters:close", headers=admin_headers
+    )
+    assert response.json() == {"affected": 0}
+    assert changes_since(cursor) == []
+
+
+def test_close_unknown_location(client, admin_headers):
+    cursor = latest_change_id()
+    response = client.post(
+        f"/location/{MISSING_ID}/meters:close", headers=admin_headers
+    )
+    assert response.status_code == 404
+    assert changes_since(cursor) == []
+
+
+def test_transfer_locations(
+    client, admin_headers, make_user, make_location, make_meter
+):
+    source, target = make_user(), make_user()
+    locations = [make_location(source["id"]) for _ in range(2)]
+    make_meter(locations[0]["id"], reading=5.0)
+    untouched = make_location()
+    cursor = latest_change_id()
+
+    response = client.post(
+        f"/user/{source['id']}/locations:transfer",
+        headers=admin_headers,
+        json={"target_user_id": target["id"]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"affected": 2}
+    with Session(engine) as session:
+        owners = dict(
+            session.exec(
+                select(Location.id, Location.user_id).where(
+                    Location.id.in_(
+                        [location["id"] for location in locations]
+                        + [untouched["id"]]
+                    )
+                )
+            ).all()
+        )
+    assert owners == {
+        locations[0]["id"]: target["id"],
+        locations[1]["id"]: target["id"],
+        untouched["id"]: untouched["user_id"],
+    }
+    assert sorted(changes_since(cursor)) == sorted(
+        ("location", str(location["id"]), "update") for location in locations
+    )
+    response = client.get(
+        f"/stats/users/{target['id']}", headers=admin_headers
+    )
+    assert response.json()["total"] == 1
+    response = client.get(
+        f"/stats/users/{source['id']}", headers=admin_headers
+    )
+    assert response.json()["total"] == 0
+
+    # La source n'a plus d'emplacement : transfert vide
+    cursor = latest_change_id()
+    response = client.post(
+        f"/user/{source['id']}/locations:transfer",
+        headers=admin_headers,
+        json={"target_user_id": target["id"]},
+    )
+    assert response.json() == {"affected": 0}
+    assert changes_since(cursor) == []
+
+
+def test_transfer_with_unknown_users(client, admin_headers, make_user):
+    user = make_user()
+    cursor = latest_change_id()
+    for source_id, target_id in (
+        (MISSING_ID, user["id"]),
+        (user["id"], MISSING_ID),
+    ):
+        response = client.post(
+            f"/user/{source_id}/locations:transfer",
+            headers=admin_headers,
+            json={"target_user_id": target_id},
+        )
+        assert response.status_code == 404
+    assert changes_since(cursor) == []
+
+
+def test_cascade_delete_location(
+    client, admin_headers, make_location, make_meter
+):
+    location = make_location()
+    meters = [
+        make_meter(location["id"], reading=reading, meter_type=meter_type)
+        for reading, meter_type in ((1.0, "gas"), (2.0, "water"))
+    ]
+
+    # Sans cascade, les compteurs empêchent la suppression
+    response = client.delete(
+        f"/location/{location['id']}", headers=admin_headers
+    )
+    assert response.status_code == 400
+    cursor = latest_change_id()
+
+    response = client.delete(
+        f"/location/{location['id']}?cascade=true", headers=admin_headers
+    )
+
+    assert response.status_code == 204
+    with Session(engine) as session:
+        remaining = session.exec(
+            select(func.count())
+            .select_from(Meter)
+            .where(Meter.location_id == location["id"])
+        ).one()
+        assert session.get(Location, location["id"]) is None
+        stats = session.exec(
+            select(MeterStat).where(MeterStat.location_id == location["id"])
+        ).all()
+    assert remaining == 0
+    assert stats == []
+    assert sorted(changes_since(cursor)) == sorted(
+        [("meter", meter["ean"], "delete") for meter in meters]
+        + [("location", str(location["id"]), "delete")]
+    )
+    response = client.get("/stats/", headers=admin_headers)
+    assert response.status_code == 200
+    with Session(engine) as session:
+        assert session.exec(select(func.count()).select_from(Meter)).one() == (
+            response.json()["total"]
+        )
+
+    cursor = latest_change_id()
+    response = client.delete(
+        f"/location/{location['id']}?cascade=true", headers=admin_headers
+    )
+    assert response.status_code == 404
+    assert changes_since(cursor) == []
@@ -0,0 +1,118 @@
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.changes import record_changes_from_select
+from app.database import engine
+from app.models import ChangeLog, ChangeOperation, Meter
+
+
+def latest_change_id() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.max(ChangeLog.id))).one() or 0
+
+
+def read_feed(client, headers, since: int, limit: int) -> list:
+    """Parcourt le journal page par page; retourne les pages lues."""
+    pages = []
+    while True:
+        response = client.get(
+            "/changes/",
+            headers=headers,
+            params={"since": since, "limit": limit},
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append(page)
+        since = page["next_cursor"]
+        if not page["has_more"]:
+            return pages
+
+
+def test_ids_follow_commit_order(
+    client, admin_headers, make_location, make_meter
+):
+    location = make_location()
+    cursor = latest_change_id()
+    ean = make_meter(location["id"], reading=1.0)["ean"]
+    client.patch(f"/meter/{ean}", headers=admin_headers, json={"reading": 2})
+    client.patch(
+        f"/location/{location['id']}",
+        headers=admin_headers,
+        json={"name": "Entrepôt"},
+    )
+    client.delete(f"/meter/{ean}", headers=admin_headers)
+
+    (page,) = read_feed(client, admin_headers, cursor, 100)
+
+    ids = [change["id"] for change in page["changes"]]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert [
+        (change["entity"], change["entity_id"], change["operation"])
+        for change in page["changes"]
+    ] == [
+        ("meter", ean, "create"),
+        ("meter", ean, "update"),
+        ("location", str(location["id"]), "update"),
+        ("meter", ean, "delete"),
+    ]
+    assert page["next_cursor"] == ids[-1]
+
+
+def test_since_cursor_paginates_without_gaps(
+    client, admin_headers, make_location, make_meter
+):
+    location_id = make_location()["id"]
+    cursor = latest_change_id()
+    for _ in range(7):
+        make_meter(location_id)
+
+    pages = read_feed(client, admin_headers, cursor, 3)
+
+    ids = [change["id"] for page in pages for change in page["changes"]]
+    with Session(engine) as session:
+        expected = session.exec(
+            select(ChangeLog.id)
+            .where(ChangeLog.id > cursor)
+            .order_by(ChangeLog.id)
+        ).all()
+    assert ids == expected
+    assert len(ids) == 7
+    assert [len(page["changes"]) for page in pages] == [3, 3, 1]
+    assert [page["has_more"] for page in pages] == [True, True, False]
+
+    # Curseur à jour : page vide, curseur inchangé
+    response = client.get(
+        "/changes/", headers=admin_headers, params={"since": ids[-1]}
+    )
+    assert response.json() == {
+        "changes": [],
+        "next_cursor": ids[-1],
+        "has_more": False,
+    }
+
+
+def test_record_changes_from_select_returns_inserted_rows(
+    client, make_location, make_meter
+):
+    location_id = make_location()["id"]
+    eans = sorted(make_meter(location_id)["ean"] for _ in range(3))
+    cursor = latest_change_id()
+
+    with Session(engine) as session:
+        recorded = record_changes_from_select(
+            session,
+            "meter",
+            Meter.ean,
+            Meter.location_id == location_id,
+            ChangeOperation.UPDATE,
+        )
+        session.commit()
+        rows = session.exec(
+            select(ChangeLog).where(ChangeLog.id > cursor)
+        ).all()
+
+    assert sorted(recorded) == eans
+    assert sorted(row.entity_id for row in rows) == eans
+    assert {(row.entity, row.operation) for row in rows} == {
+        ("meter", ChangeOperation.UPDATE)
+    }
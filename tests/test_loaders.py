@@ -0,0 +1,93 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database import engine
+
+# Table lue par une instruction SQL (guillemets de "user" retirés)
+FROM_TABLE = re.compile(r'\bFROM "?(\w+)"?')
+
+
+@contextmanager
+def count_tables():
+    """Compte les instructions exécutées par table lue."""
+    counts = {}
+
+    def before_cursor_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        for table in set(FROM_TABLE.findall(statement)):
+            counts[table] = counts.get(table, 0) + 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def get_locations(client, headers, expand: str = None) -> tuple:
+    """Liste les emplacements; retourne (réponse, instructions par table)."""
+    params = {"expand": expand} if expand else {}
+    with count_tables() as counts:
+        response = client.get("/location/", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json(), counts
+
+
+def test_expand_runs_one_query_per_relation(
+    client, admin_headers, make_user, make_location, make_meter
+):
+    for _ in range(2):
+        user_id = make_user()["id"]
+        for _ in range(3):
+            location_id = make_location(user_id)["id"]
+            make_meter(location_id)
+            make_meter(location_id, meter_type="water")
+
+    plain, baseline = get_locations(client, admin_headers)
+    expanded, counts = get_locations(client, admin_headers, "meters,user")
+
+    assert len(expanded) == len(plain) >= 6
+    # Requêtes de la liste et de l'authentification, plus une par relation
+    assert counts.get("meter", 0) == baseline.get("meter", 0) + 1
+    assert counts.get("user", 0) == baseline.get("user", 0) + 1
+    assert all("meters" not in location for location in plain)
+    for location in expanded:
+        assert location["user"]["id"] == location["user_id"]
+        assert all(
+            meter["location_id"] == location["id"]
+            for meter in location["meters"]
+        )
+    assert sum(len(location["meters"]) for location in expanded) >= 12
+
+
+def test_location_without_user_expands_to_null(
+    client, admin_headers, make_user, make_location, make_meter
+):
+    user_id = make_user()["id"]
+    location = make_location(user_id)
+    meter = make_meter(location["id"])
+    # La suppression de l'utilisateur détache ses emplacements
+    response = client.delete(f"/user/{user_id}", headers=admin_headers)
+    assert response.status_code == 204
+
+    response = client.get(
+        f"/location/{location['id']}",
+        headers=admin_headers,
+        params={"expand": "user,meters"},
+    )
+
+    assert response.status_code == 200
+    detail = response.json()
+    assert detail["user_id"] is None
+    assert detail["user"] is None
+    assert [item["ean"] for item in detail["meters"]] == [meter["ean"]]
+
+    response = client.get(
+        f"/location/{location['id']}",
+        headers=admin_headers,
+        params={"expand": "owner"},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,181 @@
+import struct
+from datetime import datetime, timedelta
+
+import msgpack
+import numpy as np
+import pytest
+
+from app.core.reading_formats import (
+    ReadingFormatError,
+    decode_msgpack,
+    decode_protobuf,
+)
+
+PROTOBUF = {"Content-Type": "application/x-protobuf"}
+MSGPACK = {"Content-Type": "application/msgpack"}
+
+
+def varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def length_delimited(field: int, data: bytes) -> bytes:
+    return varint(field << 3 | 2) + varint(len(data)) + data
+
+
+def encode_batch(eans, readings, read_at=None) -> bytes:
+    """Encode un message ReadingBatch (app/proto/readings.proto)."""
+    body = b"".join(length_delimited(1, ean.encode()) for ean in eans)
+    body += length_delimited(2, struct.pack(f"<{len(readings)}d", *readings))
+    if read_at is not None:
+        body += length_delimited(3, struct.pack(f"<{len(read_at)}q", *read_at))
+    return body
+
+
+def microseconds(moment: datetime) -> int:
+    return int(np.datetime64(moment, "us").astype(np.int64))
+
+
+def post_batch(client, headers, body: bytes, content_type: dict):
+    return client.post(
+        "/meter/readings", headers={**headers, **content_type}, content=body
+    )
+
+
+def test_protobuf_round_trip():
+    read_at = [microseconds(datetime(2026, 1, 1, 8)), 0]
+    eans, readings, dates = decode_protobuf(
+        encode_batch(["5401", "5402"], [1.5, 2.25], read_at)
+    )
+
+    assert eans.tolist() == ["5401", "5402"]
+    assert readings.tolist() == [1.5, 2.25]
+    assert dates[0] == np.datetime64("2026-01-01T08:00", "us")
+    # Date 0 : date de réception
+    assert dates[1] > np.datetime64("2026-01-01T08:00", "us")
+
+
+def test_msgpack_round_trip():
+    body = msgpack.packb(
+        {
+            "eans": ["5401", "5402"],
+            "readings": [1.5, 3],
+            "read_at": [microseconds(datetime(2026, 1, 1, 8)), 0],
+        }
+    )
+    eans, readings, dates = decode_msgpack(body)
+
+    assert eans.tolist() == ["5401", "5402"]
+    assert readings.tolist() == [1.5, 3.0]
+    assert dates[0] == np.datetime64("2026-01-01T08:00", "us")
+
+
+@pytest.mark.parametrize("content_type", [PROTOBUF, MSGPACK])
+def test_binary_batch_is_ingested(
+    client, admin_headers, make_location, make_meter, content_type
+):
+    location_id = make_location()["id"]
+    eans = [make_meter(location_id, reading=10.0)["ean"] for _ in range(2)]
+    read_at = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+    stamps = [microseconds(read_at), microseconds(read_at)]
+    if content_type is PROTOBUF:
+        body = encode_batch(eans, [11.0, 12.5], stamps)
+    else:
+        body = msgpack.packb(
+            {"eans": eans, "readings": [11.0, 12.5], "read_at": stamps}
+        )
+
+    response = post_batch(client, admin_headers, body, content_type)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {"accepted": 2, "quarantined": 0, "reasons": {}}
+    for ean, reading in zip(eans, [11.0, 12.5]):
+        meter = client.get(f"/meter/{ean}", headers=admin_headers).json()
+        assert meter["reading"] == reading
+        assert datetime.fromisoformat(meter["last_update"]) == read_at
+
+
+def test_protobuf_unknown_fields_are_skipped(
+    client, admin_headers, make_location, make_meter
+):
+    ean = make_meter(make_location()["id"], reading=10.0)["ean"]
+    body = (
+        varint(9 << 3 | 0)
+        + varint(300)
+        + length_delimited(10, b"extension")
+        + varint(11 << 3 | 1)
+        + b"\x00" * 8
+        + encode_batch([ean], [10.5])
+    )
+
+    response = post_batch(client, admin_headers, body, PROTOBUF)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["accepted"] == 1
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        # Varint tronqué : clé, longueur, valeur
+        b"\x8a",
+        length_delimited(1, b"5401")[:1] + b"\x84",
+        varint(9 << 3 | 0) + b"\xff\xff",
+        # Champs au-delà de la fin du message
+        varint(1 << 3 | 2) + varint(50) + b"5401",
+        varint(2 << 3 | 1) + b"\x00" * 4,
+        # Types de fil non pris en charge (groupes, fixed32)
+        varint(1 << 3 | 3),
+        varint(2 << 3 | 5) + b"\x00" * 4,
+        # Type de fil inattendu pour un champ connu
+        length_delimited(1, b"5401") + varint(2 << 3 | 0) + varint(7),
+        length_delimited(2, b"\x00" * 7),
+        varint(1 << 3 | 0) + varint(5401) + encode_batch([], [1.0]),
+        # EAN non UTF-8
+        length_delimited(1, b"\xff\xfe") + encode_batch([], [1.0]),
+    ],
+)
+def test_malformed_protobuf_is_rejected(client, admin_headers, body):
+    with pytest.raises(ReadingFormatError):
+        decode_protobuf(body)
+    response = post_batch(client, admin_headers, body, PROTOBUF)
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        msgpack.packb({"eans": ["5401"], "readings": [1.0]})[:-3],
+        msgpack.packb([1, 2]),
+        msgpack.packb({"eans": ["5401"]}),
+        msgpack.packb({"eans": [5401], "readings": [1.0]}),
+        msgpack.packb({"eans": ["5401"], "readings": ["x"]}),
+        msgpack.packb({"eans": ["5401", "5402"], "readings": [1.0]}),
+        b"\xc1",
+    ],
+)
+def test_malformed_msgpack_is_rejected(client, admin_headers, body):
+    response = post_batch(client, admin_headers, body, MSGPACK)
+    assert response.status_code == 400, response.text
+
+
+def test_unsupported_content_type(client, admin_headers):
+    response = post_batch(
+        client, admin_headers, b"ean;reading", {"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 415
+
+
+def test_invalid_json_batch(client, admin_headers):
+    response = post_batch(
+        client,
+        admin_headers,
+        b'{"readings": [{"ean": "5401"}]}',
+        {"Content-Type": "application/json"},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,92 @@
+import pytest
+
+from app.core import search
+
+
+def search_names(client, headers, query: str) -> list:
+    response = client.get(
+        "/location/search", headers=headers, params={"q": query}
+    )
+    assert response.status_code == 200, response.text
+    return [location["name"] for location in response.json()]
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """Force l'index en mémoire, comme SEARCH_BACKEND=memory."""
+    monkeypatch.setattr(search.settings, "SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(search, "_location_backend", None)
+    monkeypatch.setattr(
+        search, "location_name_index", search.LocationNameIndex()
+    )
+
+
+def test_sqlite_uses_fts(client, admin_headers):
+    search_names(client, admin_headers, "site")
+    assert search._location_backend == "fts"
+
+
+def test_fts_ranks_closest_names_first(
+    client, admin_headers, make_user, make_location
+):
+    user_id = make_user()["id"]
+    for name in (
+        "Dépôt central de Vorbrakstadt et des communes voisines",
+        "Vorbrakstadt",
+        "Atelier Vorbrakstadt Nord",
+        "Entrepôt Nord",
+    ):
+        make_location(user_id, name)
+
+    assert search_names(client, admin_headers, "Vorbrakstadt") == [
+        "Vorbrakstadt",
+        "Atelier Vorbrakstadt Nord",
+        "Dépôt central de Vorbrakstadt et des communes voisines",
+    ]
+    # Trigrammes : une partie du mot suffit, sans tenir compte de la casse
+    assert search_names(client, admin_headers, "BRAKST")[0] == "Vorbrakstadt"
+    # Saisie non interprétée par FTS5
+    assert search_names(client, admin_headers, 'Vorbrak" OR "Nord') == []
+
+
+def test_short_query_matches_prefix_ignoring_case(
+    client, admin_headers, make_user, make_location
+):
+    user_id = make_user()["id"]
+    for name in ("Qjord", "qjell", "QJ Nord", "Aqj"):
+        make_location(user_id, name)
+
+    for query in ("qj", "QJ", "qJ"):
+        assert search_names(client, admin_headers, query) == [
+            "QJ Nord",
+            "qjell",
+            "Qjord",
+        ]
+
+
+def test_memory_fallback(
+    client, admin_headers, make_user, make_location, memory_backend
+):
+    user_id = make_user()["id"]
+    make_location(user_id, "Halle Krummbach")
+    make_location(user_id, "Krummbach")
+
+    assert search_names(client, admin_headers, "krummbach") == [
+        "Krummbach",
+        "Halle Krummbach",
+    ]
+    assert search._location_backend == "memory"
+
+    # Index tenu à jour depuis le journal des modifications
+    location = make_location(user_id, "Krummbach Ouest")
+    response = client.patch(
+        f"/location/{location['id']}",
+        headers=admin_headers,
+        json={"name": "Plessenau"},
+    )
+    assert response.status_code == 200
+    assert search_names(client, admin_headers, "krumm") == [
+        "Halle Krummbach",
+        "Krummbach",
+    ]
+    assert search_names(client, admin_headers, "plessenau") == ["Plessenau"]
@@ -0,0 +1,236 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHARD_COUNT = 3
+LOCATION_COUNT = 12
+METERS_PER_LOCATION = 2
+
+# Contenu de chaque shard, lu directement dans les bases
+DUMP = """
+from app.core.sharding import shard_engines
+
+def dump():
+    shards = {}
+    for name, shard_engine in shard_engines.items():
+        with shard_engine.connect() as connection:
+            shards[name] = {
+                "locations": sorted(connection.exec_driver_sql(
+                    "SELECT id FROM location").scalars().all()),
+                "meters": sorted(map(list, connection.exec_driver_sql(
+                    "SELECT ean, location_id, reading FROM meter").all())),
+            }
+    return shards
+"""
+
+# Exécutés dans un processus neuf : SHARD_URLS est lu à l'import
+SEED_SCRIPT = (
+    DUMP + """
+import json
+from fastapi.testclient import TestClient
+from app.core.sharding import hash_shard, shard_name
+from app.main import app
+
+with TestClient(app) as client:
+    token = client.post("/token", data={
+        "username": "admin@example.com",
+        "password": "admin_secure_password",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user = client.put("/user/", headers=headers, json={
+        "name": "Client", "email": "client@example.com",
+        "password": "secret", "role": "consumer",
+    }).json()
+    eans = []
+    for index in range(%(locations)d):
+        location = client.put("/location/", headers=headers, json={
+            "name": f"Site {index}", "lat": 50.0, "lon": 4.0,
+            "user_id": user["id"],
+        }).json()
+        for number in range(%(meters)d):
+            ean = f"54{index:03d}{number:05d}"
+            response = client.put("/meter/", headers=headers, json={
+                "ean": ean, "type": "gas", "reading": index * 10 + number,
+                "location_id": location["id"],
+            })
+            assert response.status_code == 201, response.text
+            eans.append(ean)
+    reads = {
+        ean: [client.get(f"/meter/{ean}", headers=headers).json()
+              for _ in range(2)]
+        for ean in eans
+    }
+    meters = client.get("/meter/", headers=headers).json()
+    locations = client.get("/location/", headers=headers).json()
+
+shards = dump()
+ids = [location_id for shard in shards.values()
+       for location_id in shard["locations"]]
+print(json.dumps({
+    "shards": shards,
+    "reads": reads,
+    "meters": [meter["ean"] for meter in meters],
+    "locations": [location["id"] for location in locations],
+    "owners": {
+        count: {location_id: shard_name(hash_shard(location_id, count))
+                for location_id in ids}
+        for count in (%(shards)d, %(shards)d - 1)
+    },
+}))
+""" % {
+        "locations": LOCATION_COUNT,
+        "meters": METERS_PER_LOCATION,
+        "shards": SHARD_COUNT,
+    }
+)
+
+READ_SCRIPT = DUMP + """
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+
+with TestClient(app) as client:
+    token = client.post("/token", data={
+        "username": "admin@example.com",
+        "password": "admin_secure_password",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    meters = client.get("/meter/", headers=headers).json()
+print(json.dumps({
+    "shards": dump(),
+    "meters": {meter["ean"]: meter for meter in meters},
+}))
+"""
+
+
+def run(directory, *args) -> str:
+    """Exécute Python avec trois shards SQLite; retourne la sortie."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "DATABASE_URL": f"sqlite:///{directory}/meter.db",
+        "BOOTSTRAP_MARKER": f"{directory}/.meter_bootstrapped",
+        "SHARD_URLS": ",".join(
+            f"sqlite:///{directory}/shard{index}.db"
+            for index in range(SHARD_COUNT)
+        ),
+        "WARMUP_ON_STARTUP": "False",
+        "RATE_LIMIT_ENABLED": "False",
+    }
+    result = subprocess.run(
+        [sys.executable, *args],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def run_json(directory, script: str) -> dict:
+    return json.loads(run(directory, "-c", script).strip().splitlines()[-1])
+
+
+def meter_shards(shards: dict) -> dict:
+    """Shard de chaque compteur, par EAN."""
+    return {
+        ean: name
+        for name, shard in shards.items()
+        for ean, _, _ in shard["meters"]
+    }
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("shards")
+    return directory, run_json(directory, SEED_SCRIPT)
+
+
+def test_meter_lives_in_the_shard_of_its_location(seeded):
+    _, seed = seeded
+    owners = seed["owners"][str(SHARD_COUNT)]
+    placement = meter_shards(seed["shards"])
+    rows = sum(len(shard["meters"]) for shard in seed["shards"].values())
+    assert rows == len(placement) == LOCATION_COUNT * METERS_PER_LOCATION
+    for name, shard in seed["shards"].items():
+        for location_id in shard["locations"]:
+            assert owners[str(location_id)] == name
+        for ean, location_id, _ in shard["meters"]:
+            assert owners[str(location_id)] == name
+    # Chaque EAN n'existe que dans un shard, et tous les shards servent
+    assert len(set(placement.values())) == SHARD_COUNT
+
+
+def test_read_by_ean_returns_its_row(seeded):
+    _, seed = seeded
+    rows = {
+        ean: (location_id, reading)
+        for shard in seed["shards"].values()
+        for ean, location_id, reading in shard["meters"]
+    }
+    for ean, responses in seed["reads"].items():
+        first, second = responses
+        assert first == second
+        assert first["ean"] == ean
+        assert (first["location_id"], first["reading"]) == rows[ean]
+
+
+def test_list_queries_fan_out_and_merge(seeded):
+    _, seed = seeded
+    placement = meter_shards(seed["shards"])
+    assert sorted(seed["meters"]) == sorted(placement)
+    assert sorted(seed["locations"]) == sorted(
+        location_id
+        for shard in seed["shards"].values()
+        for location_id in shard["locations"]
+    )
+
+
+def test_rebalance_moves_only_changed_owners(seeded):
+    directory, seed = seeded
+    before = seed["shards"]
+    current = seed["owners"][str(SHARD_COUNT)]
+    target = seed["owners"][str(SHARD_COUNT - 1)]
+    moved = {
+        int(location_id)
+        for location_id, name in current.items()
+        if target[location_id] != name
+    }
+    # Le hachage de rendez-vous ne déplace que le contenu du shard retiré
+    last = f"shard{SHARD_COUNT - 1}"
+    assert moved == set(before[last]["locations"])
+    assert moved
+
+    run(directory, "-m", "app.rebalance", "--shards", str(SHARD_COUNT - 1))
+    after = run_json(directory, READ_SCRIPT)
+
+    assert after["shards"][last] == {"locations": [], "meters": []}
+    for name, shard in after["shards"].items():
+        # Emplacements restés en place, plus ceux reçus du shard retiré
+        assert set(shard["locations"]) == {
+            int(location_id)
+            for location_id, owner in target.items()
+            if owner == name
+        }
+        received = [
+            row
+            for row in before[last]["meters"]
+            if target[str(row[1])] == name
+        ]
+        if name != last:
+            assert shard["meters"] == sorted(before[name]["meters"] + received)
+
+    # Les lectures suivent l'annuaire mis à jour
+    for shard in before.values():
+        for ean, location_id, reading in shard["meters"]:
+            meter = after["meters"][ean]
+            assert (meter["location_id"], meter["reading"]) == (
+                location_id,
+                reading,
+            )
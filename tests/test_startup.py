@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+# Durée maximale de l'import de l'application et du lifespan (marqueur
+# présent : ni création du schéma ni amorçage)
+STARTUP_BUDGET_SECONDS = 3.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Exécuté dans un processus neuf : l'import n'est mesuré qu'à froid
+STARTUP_SCRIPT = """
+import json, time
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+from app.main import app
+with TestClient(app):
+    pass
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "phases": list(app.state.startup_timings),
+}))
+"""
+
+
+def run_startup(directory, database: str) -> dict:
+    """Démarre puis arrête l'application; retourne durée et phases."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "DATABASE_URL": f"sqlite:///{directory}/{database}",
+        "BOOTSTRAP_MARKER": f"{directory}/.meter_bootstrapped",
+        "SHARD_URLS": "",
+        "WARMUP_ON_STARTUP": "False",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_with_marker_within_budget(tmp_path):
+    first = run_startup(tmp_path, "meter.db")
+    assert "bootstrap" in first["phases"]
+
+    second = run_startup(tmp_path, "meter.db")
+    assert "schema" not in second["phases"]
+    assert "bootstrap" not in second["phases"]
+    assert second["seconds"] < STARTUP_BUDGET_SECONDS
+
+
+def test_marker_of_another_database_is_ignored(tmp_path):
+    run_startup(tmp_path, "meter.db")
+
+    other = run_startup(tmp_path, "other.db")
+    assert "bootstrap" in other["phases"]
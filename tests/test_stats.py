@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from app.core.stats import reconcile_meter_stats
+from app.database import engine
+from app.models import Meter, MeterStat
+
+
+def recomputed() -> dict:
+    """Statistiques recalculées par COUNT(*) sur la table des compteurs."""
+    location_id = func.coalesce(Meter.location_id, 0)
+    statement = select(
+        location_id,
+        Meter.type,
+        Meter.status,
+        func.count(),
+        func.sum(Meter.reading),
+    ).group_by(location_id, Meter.type, Meter.status)
+    with Session(engine) as session:
+        return {
+            (row[0], row[1].value, row[2].value): (row[3], row[4])
+            for row in session.exec(statement)
+        }
+
+
+def stored() -> dict:
+    with Session(engine) as session:
+        rows = session.exec(select(MeterStat)).all()
+    return {
+        (row.location_id, row.type.value, row.status.value): (
+            row.count,
+            row.reading_total,
+        )
+        for row in rows
+        if row.count
+    }
+
+
+def assert_stats_match():
+    expected = recomputed()
+    actual = stored()
+    assert actual.keys() == expected.keys()
+    for key, (count, reading_total) in expected.items():
+        assert actual[key] == (count, pytest.approx(reading_total)), key
+
+
+def test_stats_follow_create_close_and_cascade(
+    client, admin_headers, make_location, make_meter
+):
+    closing, deleted = make_location(), make_location()
+    for location in (closing, deleted):
+        make_meter(location["id"], reading=12.5)
+        make_meter(location["id"], reading=7.5, meter_type="electricity")
+    ean = make_meter(closing["id"], reading=3.0, meter_type="water")["ean"]
+    assert_stats_match()
+
+    response = client.patch(
+        f"/meter/{ean}", headers=admin_headers, json={"reading": 4.0}
+    )
+    assert response.status_code == 200
+    response = client.post(
+        f"/location/{closing['id']}/meters:close", headers=admin_headers
+    )
+    assert response.json() == {"affected": 3}
+    assert_stats_match()
+
+    response = client.delete(
+        f"/location/{deleted['id']}?cascade=true", headers=admin_headers
+    )
+    assert response.status_code == 204
+    assert_stats_match()
+
+    response = client.get(
+        f"/stats/locations/{closing['id']}", headers=admin_headers
+    )
+    assert response.json()["total"] == 3
+    assert {
+        (group["type"], group["status"], group["reading_total"])
+        for group in response.json()["groups"]
+    } == {
+        ("gas", "close", 12.5),
+        ("electricity", "close", 7.5),
+        ("water", "close", 4.0),
+    }
+
+
+def test_reconcile_repairs_drifted_row(
+    client, admin_headers, make_location, make_meter
+):
+    location_id = make_location()["id"]
+    make_meter(location_id, reading=20.0)
+    make_meter(location_id, reading=30.0)
+    stats = MeterStat.__table__
+    with Session(engine) as session:
+        # Dérive volontaire : écriture hors API
+        session.execute(
+            update(stats)
+            .where(stats.c.location_id == location_id)
+            .values(count=stats.c.count + 5, reading_total=0.0)
+        )
+        session.commit()
+    assert stored()[(location_id, "gas", "open")] == (7, 0.0)
+
+    with Session(engine) as session:
+        result = reconcile_meter_stats(session)
+
+    assert result["drifted"] == 1
+    assert stored()[(location_id, "gas", "open")] == (2, 50.0)
+    assert_stats_match()
+    with Session(engine) as session:
+        assert reconcile_meter_stats(session)["drifted"] == 0
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import MeterReading, QuarantinedReading
+
+UNKNOWN_EAN = "549999999999999999"
+
+
+def ingest(client, headers, readings: list) -> dict:
+    response = client.post(
+        "/meter/readings", headers=headers, json={"readings": readings}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def hours_from_now(hours: float) -> str:
+    return (datetime.utcnow() + timedelta(hours=hours)).isoformat()
+
+
+def quarantined(ean: str) -> list:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(QuarantinedReading)
+            .where(QuarantinedReading.ean == ean)
+            .order_by(QuarantinedReading.read_at)
+        ).all()
+    return [(row.reason, row.reading, row.previous_reading) for row in rows]
+
+
+def history(ean: str) -> list:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(MeterReading)
+            .where(MeterReading.ean == ean)
+            .order_by(MeterReading.read_at)
+        ).all()
+    return [row.reading for row in rows]
+
+
+@pytest.mark.parametrize(
+    "reason, reading, hours",
+    [
+        ("regression", 90.0, 1),
+        ("stale", 110.0, -24),
+        ("spike", 1_100.0, 1),
+    ],
+)
+def test_quarantine_reason(
+    client, admin_headers, make_location, make_meter, reason, reading, hours
+):
+    ean = make_meter(make_location()["id"], reading=100.0)["ean"]
+
+    result = ingest(
+        client,
+        admin_headers,
+        [{"ean": ean, "reading": reading, "read_at": hours_from_now(hours)}],
+    )
+
+    assert result == {"accepted": 0, "quarantined": 1, "reasons": {reason: 1}}
+    assert quarantined(ean) == [(reason, reading, 100.0)]
+    response = client.get(f"/meter/{ean}", headers=admin_headers)
+    assert response.json()["reading"] == 100.0
+    assert history(ean) == [100.0]
+
+
+def test_unknown_meter_is_quarantined(client, admin_headers):
+    result = ingest(
+        client,
+        admin_headers,
+        [{"ean": UNKNOWN_EAN, "reading": 5.0, "read_at": hours_from_now(1)}],
+    )
+
+    assert result == {
+        "accepted": 0,
+        "quarantined": 1,
+        "reasons": {"unknown_meter": 1},
+    }
+    assert quarantined(UNKNOWN_EAN)[-1] == ("unknown_meter", 5.0, None)
+
+
+def test_mixed_batch(client, admin_headers, make_location, make_meter):
+    location_id = make_location()["id"]
+    steady = make_meter(location_id, reading=100.0)["ean"]
+    spiking = make_meter(location_id, reading=50.0)["ean"]
+
+    result = ingest(
+        client,
+        admin_headers,
+        [
+            # Désordonnés : chaque compteur est trié par date
+            {"ean": steady, "reading": 108.0, "read_at": hours_from_now(3)},
+            {"ean": steady, "reading": 105.0, "read_at": hours_from_now(1)},
+            {"ean": steady, "reading": 103.0, "read_at": hours_from_now(2)},
+            {"ean": spiking, "reading": 5_000.0, "read_at": hours_from_now(1)},
+            {"ean": UNKNOWN_EAN, "reading": 1.0},
+        ],
+    )
+
+    assert result == {
+        "accepted": 2,
+        "quarantined": 3,
+        "reasons": {"regression": 1, "spike": 1, "unknown_meter": 1},
+    }
+    # Comparé au dernier relevé accepté du lot (105), pas à la base
+    assert quarantined(steady) == [("regression", 103.0, 105.0)]
+    assert quarantined(spiking) == [("spike", 5_000.0, 50.0)]
+    assert history(steady) == [100.0, 105.0, 108.0]
+    response = client.get(f"/meter/{steady}", headers=admin_headers)
+    assert response.json()["reading"] == 108.0
+
+
+def test_read_at_defaults_to_reception(
+    client, admin_headers, make_location, make_meter
+):
+    ean = make_meter(make_location()["id"], reading=100.0)["ean"]
+    before = datetime.utcnow()
+
+    result = ingest(client, admin_headers, [{"ean": ean, "reading": 100.5}])
+
+    after = datetime.utcnow()
+    assert result == {"accepted": 1, "quarantined": 0, "reasons": {}}
+    response = client.get(f"/meter/{ean}", headers=admin_headers)
+    meter = response.json()
+    assert meter["reading"] == 100.5
+    assert before <= datetime.fromisoformat(meter["last_update"]) <= after
+    with Session(engine) as session:
+        latest = session.exec(
+            select(MeterReading)
+            .where(MeterReading.ean == ean)
+            .order_by(MeterReading.read_at.desc())
+        ).first()
+    assert latest.reading == 100.5
+    assert before <= latest.read_at <= after
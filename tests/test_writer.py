@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.changes import record_change
+from app.core.writer import WriteQueue, settings
+from app.database import engine
+from app.models import ChangeLog, ChangeOperation
+
+
+def write_change(key: str, executed: list):
+    """Opération qui journalise une modification et note son passage."""
+
+    def operation(session: Session) -> str:
+        executed.append(key)
+        record_change(session, "meter", key, ChangeOperation.UPDATE)
+        return key
+
+    return operation
+
+
+def fail(session: Session):
+    raise ValueError("écriture refusée")
+
+
+def logged_ids(keys) -> dict:
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ChangeLog).where(ChangeLog.entity_id.in_(keys))
+        ).all()
+    return {row.entity_id: row.id for row in rows}
+
+
+async def run_queue(operations, enabled: bool = True):
+    """Soumet les opérations ensemble à une file neuve."""
+    queue = WriteQueue()
+    if enabled:
+        await queue.start()
+    try:
+        return await asyncio.gather(
+            *(queue.submit(operation) for operation in operations),
+            return_exceptions=True,
+        )
+    finally:
+        await queue.stop()
+
+
+def test_batch_runs_in_submission_order(client):
+    keys = [f"queued-{index}" for index in range(20)]
+    executed = []
+
+    results = asyncio.run(
+        run_queue([write_change(key, executed) for key in keys])
+    )
+
+    assert results == keys
+    assert executed == keys
+    ids = logged_ids(keys)
+    assert [ids[key] for key in keys] == sorted(ids.values())
+
+
+def test_failed_operation_raises_for_its_caller_only(client):
+    keys = ["batch-before", "batch-after"]
+    executed = []
+    operations = [
+        write_change(keys[0], executed),
+        fail,
+        write_change(keys[1], executed),
+    ]
+
+    before, failed, after = asyncio.run(run_queue(operations))
+
+    assert (before, after) == tuple(keys)
+    assert isinstance(failed, ValueError)
+    assert set(logged_ids(keys)) == set(keys)
+
+
+def test_disabled_queue_writes_inline(client, monkeypatch):
+    monkeypatch.setattr(settings, "WRITE_QUEUE_ENABLED", False)
+    queue = WriteQueue()
+    assert not queue.enabled
+
+    async def submit():
+        await queue.start()
+        assert queue._task is None
+        key = await queue.submit(write_change("inline", []))
+        with pytest.raises(ValueError):
+            await queue.submit(fail)
+        return key
+
+    assert asyncio.run(submit()) == "inline"
+    assert set(logged_ids(["inline"])) == {"inline"}
+
+
+def test_meter_writes_go_through_the_queue(
+    client, admin_headers, make_location, make_meter
+):
+    location = make_location()
+    meter = make_meter(location["id"], reading=10.0)
+    ean = meter["ean"]
+
+    response = client.patch(
+        f"/meter/{ean}", headers=admin_headers, json={"reading": 5.0}
+    )
+    assert response.status_code == 400
+    response = client.patch(
+        f"/meter/{ean}", headers=admin_headers, json={"reading": 12.5}
+    )
+    assert response.status_code == 200
+    assert response.json()["reading"] == 12.5
+
+    response = client.delete(f"/meter/{ean}", headers=admin_headers)
+    assert response.status_code == 204
+    response = client.delete(f"/meter/{ean}", headers=admin_headers)
+    assert response.status_code == 404
+    response = client.put(
+        "/meter/",
+        headers=admin_headers,
+        json={
+            "ean": ean,
+            "type": "gas",
+            "reading": 1.0,
+            "location_id": location["id"] + 10_000,
+        },
+    )
+    assert response.status_code == 404